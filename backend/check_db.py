@@ -1,17 +1,25 @@
 import asyncio
-from .database import init_db, get_incidents
+from .database import get_collection
+
+RECENT_LIMIT = 10
+# Only the fields printed below - skips _id/image_path on the wire and in BSON decoding
+RECENT_PROJECTION = {"_id": 0, "type": 1, "timestamp": 1, "confidence": 1, "description": 1}
 
 async def main():
-    await init_db()
-    incidents = await get_incidents()
+    collection = await get_collection()
+    total = await collection.count_documents({})
+    # Newest first, backed by the descending timestamp index created in database._connect
+    incidents = await collection.find_many(
+        {}, projection=RECENT_PROJECTION, sort={"timestamp": -1}, limit=RECENT_LIMIT
+    )
     
     print("\n" + "="*60)
-    print(f"TOTAL INCIDENTS IN DATABASE: {len(incidents)}")
+    print(f"TOTAL INCIDENTS IN DATABASE: {total}")
     print("="*60)
     
     if len(incidents) > 0:
         print("\nRECENT INCIDENTS:")
-        for i, incident in enumerate(incidents[:10], 1):
+        for i, incident in enumerate(incidents, 1):
             print(f"\n{i}. {incident['type']}")
             print(f"   Time: {incident['timestamp']}")
             print(f"   Confidence: {incident['confidence']}")
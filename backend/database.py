@@ -1,46 +1,187 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from mongojet import create_client, IndexModel
+import asyncio
 import datetime
 import os
+import orjson
 from dotenv import load_dotenv
 
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError
+except ImportError:
+    aioredis = None
+    RedisError = Exception  # Never raised: without redis the cache stays disabled
+
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 DB_NAME = "Real_Time_Violence_Detection"
 COLLECTION_NAME = "incidents"
+MAX_POOL_SIZE = 16
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+INCIDENTS_CACHE_TTL = 30  # seconds
+INCIDENTS_CACHE_PREFIX = "incidents:"
+FLUSH_INTERVAL = 0.25  # seconds between batched incident writes
+FLUSH_MAX_ATTEMPTS = 3  # insert_many tries per batch before it is dropped
+INCIDENT_RETENTION_SECONDS = 30 * 24 * 3600  # Auto-purge incidents after 30 days
 
 client = None
 db = None
 collection = None
+redis = None
+_init_task = None
+_incident_queue = None
+_flush_task = None
+_STOP = object()  # Queued by close_db; the flush task writes what precedes it, then exits
 
-async def init_db():
-    global client, db, collection
-    client = AsyncIOMotorClient(MONGO_URI)
-    db = client[DB_NAME]
+async def _connect():
+    global client, db, collection, redis, _incident_queue, _flush_task
+    separator = "&" if "?" in MONGO_URI else "?"
+    client = await create_client(f"{MONGO_URI}{separator}maxPoolSize={MAX_POOL_SIZE}")
+    db = client.get_database(DB_NAME)
     collection = db[COLLECTION_NAME]
     print(f"Connected to MongoDB at {MONGO_URI}")
+    
+    # Descending timestamp index backs the newest-first query and doubles as
+    # the TTL index (idempotent - no-op if it already exists)
+    await collection.create_indexes([
+        IndexModel(keys={"timestamp": -1}, options={"expireAfterSeconds": INCIDENT_RETENTION_SECONDS})
+    ])
+    
+    # Incidents are written in batches by a background task
+    _incident_queue = asyncio.Queue()
+    _flush_task = asyncio.create_task(_flush_incidents())
+    
+    # Optional read cache in front of get_incidents
+    if aioredis:
+        try:
+            redis = aioredis.from_url(REDIS_URL)
+            await redis.ping()
+            print(f"Connected to Redis at {REDIS_URL}")
+        except Exception as e:
+            print(f"⚠️ Redis unavailable, incident cache disabled: {e}")
+            redis = None
+
+async def init_db():
+    """Connect once; concurrent callers share the same in-flight initialization"""
+    global _init_task
+    if _init_task is None:
+        _init_task = asyncio.ensure_future(_connect())
+    try:
+        await _init_task
+    except Exception:
+        _init_task = None  # Allow a later call to retry
+        raise
+
+async def get_collection():
+    """Return the incidents collection, initializing the connection on first use"""
+    await init_db()
+    return collection
+
+async def _invalidate_incident_cache():
+    """Drop every cached incidents page (cached pages expire anyway if Redis errors)"""
+    try:
+        keys = [key async for key in redis.scan_iter(match=f"{INCIDENTS_CACHE_PREFIX}*")]
+        if keys:
+            await redis.unlink(*keys)
+    except RedisError as e:
+        print(f"⚠️ Redis error invalidating incident cache: {e}")
+
+async def _write_batch(batch):
+    """insert_many one batch, retrying with backoff up to FLUSH_MAX_ATTEMPTS times"""
+    for attempt in range(1, FLUSH_MAX_ATTEMPTS + 1):
+        try:
+            # ordered=False so one malformed document doesn't stall the rest
+            await collection.insert_many(batch, ordered=False)
+            break
+        except Exception as e:
+            if attempt == FLUSH_MAX_ATTEMPTS:
+                print(f"❌ Dropped {len(batch)} incident(s) after {attempt} failed writes: {e}")
+                return
+            print(f"⚠️ Failed to write {len(batch)} incident(s) (attempt {attempt}/{FLUSH_MAX_ATTEMPTS}), retrying: {e}")
+            await asyncio.sleep(FLUSH_INTERVAL * 2 ** attempt)
+    
+    if redis is not None:
+        await _invalidate_incident_cache()
+    print(f"Logged {len(batch)} incident(s) to MongoDB")
+
+async def _flush_incidents():
+    """Background task draining queued incidents into one insert_many per interval"""
+    while True:
+        batch = [await _incident_queue.get()]
+        while not _incident_queue.empty():
+            batch.append(_incident_queue.get_nowait())
+        
+        # Incidents queued after close_db's marker can follow it; write only what precedes it
+        stop = next((i for i, item in enumerate(batch) if item is _STOP), None)
+        if stop is not None:
+            batch = batch[:stop]
+        if batch:
+            await _write_batch(batch)
+        if stop is not None:
+            return
+        
+        await asyncio.sleep(FLUSH_INTERVAL)
+
+async def close_db():
+    """Write out every queued incident, then drop the connections (application shutdown)"""
+    global _init_task, _flush_task, redis
+    if _flush_task is None:
+        return
+    
+    _incident_queue.put_nowait(_STOP)
+    try:
+        await _flush_task
+    except Exception as e:
+        print(f"❌ Incident flush task failed: {e}")
+    _flush_task = None
+    _init_task = None  # A later log_incident reconnects
+    
+    if redis is not None:
+        try:
+            await redis.close()
+        except RedisError as e:
+            print(f"⚠️ Redis error on close: {e}")
+        redis = None
 
 async def log_incident(incident_type, confidence, description, image_path):
-    if collection is None:
-        await init_db()
+    await init_db()
     
     incident = {
-        "timestamp": datetime.datetime.now().isoformat(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc),  # BSON Date for index range scans + TTL
         "type": incident_type,
         "confidence": confidence,
         "description": description,
         "image_path": image_path
     }
-    await collection.insert_one(incident)
-    print(f"Logged incident to MongoDB: {incident_type}")
+    # Non-blocking for the detection loop - written by _flush_incidents
+    _incident_queue.put_nowait(incident)
 
 async def get_incidents(limit=50):
-    if collection is None:
-        await init_db()
+    collection = await get_collection()
     
-    cursor = collection.find().sort("timestamp", -1).limit(limit)
-    incidents = []
-    async for doc in cursor:
+    key = f"{INCIDENTS_CACHE_PREFIX}{limit}"
+    if redis is not None:
+        try:
+            cached = await redis.get(key)
+        except RedisError as e:
+            print(f"⚠️ Redis error reading incident cache, querying MongoDB: {e}")
+            cached = None
+        if cached is not None:
+            return orjson.loads(cached)
+    
+    # Fetch all documents in one batch instead of iterating a cursor
+    incidents = await collection.find_many({}, sort={"timestamp": -1}, limit=limit)
+    for doc in incidents:
         doc["_id"] = str(doc["_id"]) # Convert ObjectId to string for JSON serialization
-        incidents.append(doc)
+        if isinstance(doc["timestamp"], datetime.datetime):
+            # BSON Dates come back as naive UTC
+            doc["timestamp"] = doc["timestamp"].replace(tzinfo=datetime.timezone.utc).isoformat()
+    
+    if redis is not None:
+        try:
+            await redis.setex(key, INCIDENTS_CACHE_TTL, orjson.dumps(incidents))
+        except RedisError as e:
+            print(f"⚠️ Redis error caching incidents: {e}")
     return incidents
@@ -1,35 +1,55 @@
 import os
 from dotenv import load_dotenv
+import asyncio
+import concurrent.futures
+import logging
+import shutil
+import time
 import cv2
-import base64
-import json
-from typing import Dict, Optional
+import torch
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from .log_config import get_logger
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
+# ⚡ OPTIMIZATION: One bounded pool for blocking cv2/model work, so inference
+# never runs on the event loop and doesn't contend with the default executor
+_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix='detect')
+
+
+async def run_blocking(fn, *args):
+    """Run a blocking function on the shared detection thread pool"""
+    return await asyncio.get_running_loop().run_in_executor(_POOL, fn, *args)
+
 # Using local DETR and YOLOv8 models for weapon detection (no cloud API)
 try:
     from ultralytics import YOLO
-    print("✅ YOLOv8 loaded - Using local weapon detection model")
+    from ultralytics.utils import ops
+    logger.info("✅ YOLOv8 loaded - Using local weapon detection model")
 except ImportError:
-    print("⚠️ YOLOv8 not installed - Will download on first use")
+    logger.warning("⚠️ YOLOv8 not installed - Will download on first use")
     YOLO = None
+    ops = None
 
 # Import hybrid detection components
 try:
     from .violence_lstm_detector import ViolenceLSTMDetector
-    print("✅ CNN-LSTM violence detector available")
+    logger.info("✅ CNN-LSTM violence detector available")
     LSTM_AVAILABLE = True
 except ImportError:
-    print("⚠️ CNN-LSTM not available - weapon detection only")
+    logger.warning("⚠️ CNN-LSTM not available - weapon detection only")
     LSTM_AVAILABLE = False
 
 try:
     from .model_fusion import DetectionFusionEngine, FUSION_PRESETS
-    print("✅ Model fusion engine loaded")
+    logger.info("✅ Model fusion engine loaded")
     FUSION_AVAILABLE = True
 except ImportError:
-    print("⚠️ Model fusion not available")
+    logger.warning("⚠️ Model fusion not available")
     FUSION_AVAILABLE = False
 
 from .hybrid_config import get_system_config
@@ -43,6 +63,18 @@ class DetectionEngine:
     - Stream 2: Violence detection (CNN-LSTM) - Sequence-level
     """
     
+    # DETR label -> weapon name (keys lowercase; labels are lowered before lookup)
+    WEAPON_MAP = {
+        'label_0': 'knife', 'label_1': 'pistol',
+        'label_2': 'rifle', 'label_3': 'knife',
+        'knife': 'knife', 'pistol': 'pistol',
+        'gun': 'pistol', 'rifle': 'rifle'
+    }
+    
+    # Reject very small detections (likely false positives)
+    # Increased from 500 to 2000 to filter out small noise
+    MIN_DETECTION_AREA = 2000
+    
     def __init__(self, fusion_preset: str = "balanced", enable_violence_detection: bool = False):
         """
         Initialize hybrid detection engine
@@ -55,6 +87,7 @@ class DetectionEngine:
         self.config = get_system_config(fusion_preset)
         self.model = None
         self.detector = None
+        self.detr_processor = None
         self.violence_detector = None
         self.fusion_engine = None
         self.last_error = None
@@ -62,28 +95,56 @@ class DetectionEngine:
         
         # ⚡ OPTIMIZATION: Frame resizing for faster inference
         self.target_size = (640, 480)  # Reduce from full resolution to 640x480
-        self.resize_scale = 1.0
+        self.gpu_preprocess = torch.cuda.is_available()  # Resize + BGR->RGB on the GPU
+        
+        # ⚡ OPTIMIZATION: Micro-batch frames across camera streams
+        self.max_batch_size = 8
+        self.batch_timeout = 0.008  # Wait up to 8ms for more frames to fill a batch
+        self._batch_queue = None
+        self._batch_loop = None
+        self._batch_task = None
+        
+        # ⚡ OPTIMIZATION: CUDA graph replay for the PyTorch YOLOv8 fallback
+        self.yolo_backend = None
+        self.yolo_amp = False  # FP16 autocast for the PyTorch YOLOv8 path (Turing+ only)
+        self._cuda_graph = None
+        self._graph_input = None
+        self._graph_output = None
         
         # Initialize weapon detector
         try:
             if YOLO:
                 # Load DETR weapon detection model - better for knife detection
                 # Using NabilaLM/detr-weapons-detection (more accurate than YOLOv8)
-                print("📥 Loading DETR weapon detection model (Stream 1)...")
-                from transformers import pipeline
-                # ⚡ OPTIMIZATION: Use device_map for GPU efficiency
-                self.detector = pipeline("object-detection", model="NabilaLM/detr-weapons-detection", device=0)
-                print("✅ DETR weapon detection model loaded successfully")
+                logger.info("📥 Loading DETR weapon detection model (Stream 1)...")
+                from transformers import AutoImageProcessor, AutoModelForObjectDetection
+                # ⚡ OPTIMIZATION: Drive processor + model directly (no PIL round-trip)
+                # and run DETR in FP16 on CUDA so tensor cores are used
+                detr_model_name = self.config.weapon_config.detr_model_name
+                self.detr_device = 'cuda' if torch.cuda.is_available() else 'cpu'
+                self.detr_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
+                self.detr_processor = AutoImageProcessor.from_pretrained(detr_model_name, use_fast=True)
+                self.detector = AutoModelForObjectDetection.from_pretrained(
+                    detr_model_name, torch_dtype=self.detr_dtype
+                ).to(self.detr_device).eval()
+                logger.info("✅ DETR weapon detection model loaded successfully")
+                
+                # ⚡ OPTIMIZATION: Cheap YOLOv8 pre-filter so DETR only runs to confirm
+                if self.config.weapon_config.cascade_enabled:
+                    try:
+                        self.model = self._load_yolo_model('weights/best.pt')
+                        logger.info("✅ YOLOv8 loaded as cascade pre-filter")
+                    except Exception as e:
+                        logger.warning("⚠️ YOLOv8 pre-filter unavailable, running DETR on every frame: %s", e)
+                        self.model = None
             else:
-                print("⚠️ YOLOv8 not available, install with: pip install ultralytics")
+                logger.warning("⚠️ YOLOv8 not available, install with: pip install ultralytics")
         except Exception as e:
-            print(f"❌ Error loading detection model: {e}")
-            print("📥 Falling back to YOLOv8...")
+            logger.error("❌ Error loading detection model: %s", e)
+            logger.info("📥 Falling back to YOLOv8...")
             try:
-                self.model = YOLO('weights/best.pt')
-                # ⚡ OPTIMIZATION: Enable model optimization
-                self.model.to('cuda')  # Move to GPU
-                print("✅ YOLOv8 loaded as fallback")
+                self.model = self._load_yolo_model('weights/best.pt')
+                logger.info("✅ YOLOv8 loaded as fallback")
                 self.detector = None
             except:
                 self.last_error = str(e)
@@ -91,15 +152,16 @@ class DetectionEngine:
         # Initialize violence detector (CNN-LSTM)
         if self.enable_violence_detection:
             try:
-                print("📥 Loading CNN-LSTM violence detection model (Stream 2)...")
+                logger.info("📥 Loading CNN-LSTM violence detection model (Stream 2)...")
                 self.violence_detector = ViolenceLSTMDetector(
                     sequence_length=16,
                     frame_skip=2,
-                    confidence_threshold=0.60
+                    confidence_threshold=0.60,
+                    checkpoint_path=self.config.violence_config.checkpoint_path or None
                 )
-                print("✅ CNN-LSTM violence detection model loaded successfully")
+                logger.info("✅ CNN-LSTM violence detection model loaded successfully")
             except Exception as e:
-                print(f"⚠️ Could not load CNN-LSTM: {e}")
+                logger.warning("⚠️ Could not load CNN-LSTM: %s", e)
                 self.violence_detector = None
                 self.enable_violence_detection = False
         
@@ -107,29 +169,144 @@ class DetectionEngine:
         # Initialize fusion engine
         if FUSION_AVAILABLE and (self.detector or self.model) and self.enable_violence_detection:
             try:
-                print("📥 Initializing detection fusion engine...")
+                logger.info("📥 Initializing detection fusion engine...")
                 # preset_config = FUSION_PRESETS.get(fusion_preset, FUSION_PRESETS["balanced"])
                 self.fusion_engine = DetectionFusionEngine(
                     weapon_threshold=self.config.fusion_config.weapon_threshold,
                     violence_threshold=self.config.fusion_config.violence_threshold,
                     fusion_mode=self.config.fusion_config.fusion_mode
                 )
-                print(f"✅ Fusion engine loaded ({fusion_preset} preset)")
+                logger.info("✅ Fusion engine loaded (%s preset)", fusion_preset)
             except Exception as e:
-                print(f"⚠️ Fusion engine failed: {e}")
+                logger.warning("⚠️ Fusion engine failed: %s", e)
                 self.fusion_engine = None
         
-        # Temporal consistency tracking
-        self.consecutive_weapon_detections = 0
+        if (self.model and self.config.weapon_config.yolo_cuda_graph
+                and self.gpu_preprocess and self.yolo_backend == "pytorch"):
+            try:
+                self._capture_yolo_graph()
+                logger.info("✅ YOLOv8 CUDA graph captured")
+            except Exception as e:
+                logger.warning("⚠️ CUDA graph capture failed, using eager YOLOv8: %s", e)
+                self._cuda_graph = None
+        
+        # Temporal consistency tracking (per camera)
+        self.consecutive_weapon_detections = defaultdict(int)
         self.required_consecutive_frames = 3
 
-    async def analyze_frame(self, frame):
+    def _load_yolo_model(self, weights_path: str):
+        """
+        Load YOLOv8 weights, preferring TensorRT engines on CUDA
+        Engines are exported once and cached beside the .pt weights:
+        INT8 (when calibration data is configured) > FP16 > PyTorch weights
+        """
+        engine_path = os.path.splitext(weights_path)[0] + '.engine'
+        int8_path = os.path.splitext(weights_path)[0] + '_int8.engine'
+        
+        if torch.cuda.is_available():
+            if not os.path.exists(engine_path):
+                try:
+                    logger.info("⚙️ Exporting YOLOv8 to TensorRT FP16 engine (one-time)...")
+                    YOLO(weights_path).export(format="engine", imgsz=640, half=True, device=0, dynamic=True, batch=self.max_batch_size)
+                except Exception as e:
+                    logger.warning("⚠️ TensorRT export failed, using PyTorch weights: %s", e)
+            
+            if (self.config.weapon_config.yolo_int8_calibration_data
+                    and os.path.exists(engine_path)
+                    and not os.path.exists(int8_path)
+                    and not os.path.exists(int8_path + '.rejected')):
+                self._export_int8_engine(weights_path, engine_path, int8_path)
+            
+            for path in (int8_path, engine_path):
+                if os.path.exists(path):
+                    logger.info("✅ YOLOv8 TensorRT engine loaded: %s", path)
+                    self.yolo_backend = "tensorrt"
+                    return YOLO(path, task='detect')
+        
+        model = YOLO(weights_path)
+        model.to('cuda')  # Move to GPU
+        # ⚡ OPTIMIZATION: Fuse Conv+BN once; autocast only pays off with tensor cores
+        model.fuse()
+        self.yolo_amp = torch.cuda.get_device_capability()[0] >= 7
+        self.yolo_backend = "pytorch"
+        return model
+    
+    def _capture_yolo_graph(self):
+        """
+        Capture the PyTorch YOLOv8 forward pass as a CUDA graph at batch=1
+        Only valid for the fixed target_size input produced by GPU preprocessing
+        """
+        target_width, target_height = self.target_size
+        network = self.model.model
+        network.eval()
+        self._graph_input = torch.zeros(1, 3, target_height, target_width, device='cuda')
+        
+        # Warm up on a side stream so lazy allocations happen before capture
+        side_stream = torch.cuda.Stream()
+        side_stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(side_stream), torch.no_grad(), self._yolo_autocast():
+            for _ in range(3):
+                network(self._graph_input)
+        torch.cuda.current_stream().wait_stream(side_stream)
+        
+        self._cuda_graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(self._cuda_graph), torch.no_grad(), self._yolo_autocast():
+            output = network(self._graph_input)
+        # Eval-mode DetectionModel returns (predictions, raw feature maps)
+        self._graph_output = output[0] if isinstance(output, (list, tuple)) else output
+
+    def _export_int8_engine(self, weights_path: str, engine_path: str, int8_path: str):
+        """
+        Export an INT8 TensorRT engine calibrated on representative CCTV frames
+        The engine is set aside as '.rejected' if its mAP (overall or on the
+        knife class) drops more than yolo_int8_max_map_drop below the FP16 engine
+        """
+        calibration_data = self.config.weapon_config.yolo_int8_calibration_data
+        max_map_drop = self.config.weapon_config.yolo_int8_max_map_drop
+        # Export from a copy so the FP16 engine beside best.pt is not overwritten
+        int8_weights = os.path.splitext(int8_path)[0] + '.pt'
+        
+        try:
+            logger.info("⚙️ Exporting YOLOv8 to TensorRT INT8 engine (one-time calibration)...")
+            shutil.copyfile(weights_path, int8_weights)
+            YOLO(int8_weights).export(
+                format="engine", imgsz=640, int8=True, data=calibration_data,
+                device=0, dynamic=True, batch=self.max_batch_size
+            )
+            
+            fp16_metrics = YOLO(engine_path, task='detect').val(data=calibration_data, imgsz=640, batch=1, verbose=False)
+            int8_metrics = YOLO(int8_path, task='detect').val(data=calibration_data, imgsz=640, batch=1, verbose=False)
+            
+            map_drops = [fp16_metrics.box.map - int8_metrics.box.map]
+            map_drops += [
+                fp16_metrics.box.maps[class_id] - int8_metrics.box.maps[class_id]
+                for class_id, name in int8_metrics.names.items() if name.lower() == 'knife'
+            ]
+            
+            if max(map_drops) > max_map_drop:
+                logger.warning("⚠️ INT8 engine mAP dropped by %.3f, keeping FP16 engine", max(map_drops))
+                os.replace(int8_path, int8_path + '.rejected')
+            else:
+                logger.info("✅ INT8 engine validated (mAP drop %.3f)", max(map_drops))
+        except Exception as e:
+            logger.warning("⚠️ INT8 export failed, using FP16 engine: %s", e)
+        finally:
+            if os.path.exists(int8_weights):
+                os.remove(int8_weights)
+
+    async def analyze_frame(self, frame, camera_id: str = "default", source_size: Optional[tuple] = None):
         """
         Hybrid frame analysis combining weapon and violence detection
         
         Stream 1: Weapon Detection (DETR/YOLOv8) - Instant frame-level analysis
         Stream 2: Violence Detection (CNN-LSTM) - Temporal pattern analysis
         Fusion: Combines both streams for comprehensive threat assessment
+        
+        Args:
+            frame: BGR frame from OpenCV
+            camera_id: Source camera, used to track temporal consistency per stream
+            source_size: (width, height) of the original image when frame was decoded
+                         downscaled; bboxes are reported in these coordinates
         """
         
         if not self.model and not self.detector:
@@ -145,23 +322,26 @@ class DetectionEngine:
         
         try:
             # STREAM 1: Weapon Detection (Frame-level)
-            weapon_result = await self._detect_weapons(frame)
+            # Idle cameras only get the cheap YOLOv8 pass; escalate to DETR once it fires
+            escalate = self.consecutive_weapon_detections[camera_id] > 0
+            weapon_result = await self._detect_weapons(frame, escalate, source_size)
             
             # Temporal Consistency Check
             if weapon_result.get("detected"):
-                self.consecutive_weapon_detections += 1
-                if self.consecutive_weapon_detections < self.required_consecutive_frames:
-                    print(f"⏳ Potential threat tracking: {self.consecutive_weapon_detections}/{self.required_consecutive_frames} frames")
+                self.consecutive_weapon_detections[camera_id] += 1
+                consecutive = self.consecutive_weapon_detections[camera_id]
+                if consecutive < self.required_consecutive_frames:
+                    logger.debug("Potential threat tracking: %d/%d frames", consecutive, self.required_consecutive_frames)
                     # Downgrade to normal/investigating until persistence is met
                     weapon_result = {
                         "detected": False,
                         "type": "validating",
                         "confidence": weapon_result.get("confidence"),
-                        "description": f"Verifying threat ({self.consecutive_weapon_detections}/{self.required_consecutive_frames})...",
+                        "description": f"Verifying threat ({consecutive}/{self.required_consecutive_frames})...",
                         "model": weapon_result.get("model")
                     }
             else:
-                self.consecutive_weapon_detections = 0
+                self.consecutive_weapon_detections[camera_id] = 0
             
             # STREAM 2: Violence Detection (Temporal pattern)
             violence_result = {}
@@ -172,7 +352,8 @@ class DetectionEngine:
             
             # FUSION: Combine both streams
             if self.fusion_engine:
-                fused_result = self.fusion_engine.fuse_detections(weapon_result, violence_result)
+                # Convert the slotted result (and render its lazy description) once, at the API boundary
+                fused_result = self.fusion_engine.fuse_detections(weapon_result, violence_result).to_dict()
                 # Add system status information
                 fused_result["system_status"] = self.fusion_engine.get_system_status()
                 fused_result["trend"] = self.fusion_engine.get_trend_analysis()
@@ -183,9 +364,7 @@ class DetectionEngine:
             
         except Exception as e:
             error_message = f"{type(e).__name__}: {str(e)}"
-            print(f"❌ Error in hybrid detection: {error_message}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error in hybrid detection: %s", error_message)
             
             self.last_error = error_message
             return {
@@ -198,156 +377,340 @@ class DetectionEngine:
                 "error": True
             }
     
-    async def _detect_weapons(self, frame) -> Dict:
+    async def _detect_weapons(self, frame, escalate: bool = True, source_size: Optional[tuple] = None) -> Dict:
         """
         STREAM 1: Weapon Detection
         Frame-level object detection for weapons
-        ⚡ OPTIMIZED: Resize frame for faster inference while maintaining accuracy
+        ⚡ OPTIMIZED: Frames are queued and micro-batched across camera streams
+        
+        Args:
+            frame: BGR frame from OpenCV
+            escalate: Run DETR on this frame; otherwise only the YOLOv8 pre-filter
+                      runs when the cascade is active
+            source_size: (width, height) to map the bbox onto instead of the frame's own
         """
-        print("🔍 [Stream 1] Analyzing frame for weapons...")
+        loop = asyncio.get_running_loop()
         
-        # Get configured thresholds
-        detr_threshold = self.config.weapon_config.detr_confidence_threshold
-        yolo_threshold = self.config.weapon_config.yolo_confidence_threshold
+        # (Re)start the batch worker on the current event loop
+        if self._batch_loop is not loop:
+            self._batch_queue = asyncio.Queue()
+            self._batch_loop = loop
+            self._batch_task = loop.create_task(self._batch_worker())
         
-        try:
-            # ⚡ OPTIMIZATION: Resize frame for faster inference
-            original_height, original_width = frame.shape[:2]
+        # ⚡ OPTIMIZATION: Resize frame for faster inference
+        resized_frame = await run_blocking(self._preprocess_frame, frame)
+        
+        future = loop.create_future()
+        await self._batch_queue.put((resized_frame, escalate, future))
+        result = await future
+        
+        # Map the detector bbox back onto the original frame
+        bbox = result.get("bbox")
+        if bbox:
+            shape = frame.shape if source_size is None else (source_size[1], source_size[0])
+            scale_x, scale_y = self._frame_scale(shape)
+            result["bbox"] = {
+                "xmin": bbox["xmin"] / scale_x,
+                "ymin": bbox["ymin"] / scale_y,
+                "xmax": bbox["xmax"] / scale_x,
+                "ymax": bbox["ymax"] / scale_y
+            }
+        return result
+    
+    def _frame_scale(self, shape) -> tuple:
+        """Resize scale (scale_x, scale_y) from a source resolution to target_size"""
+        # Two divisions - cheaper than caching per client-controlled upload resolution
+        original_height, original_width = shape[:2]
+        target_width, target_height = self.target_size
+        return (target_width / original_width, target_height / original_height)
+    
+    def _preprocess_frame(self, frame):
+        """
+        Resize a BGR frame to target_size for the weapon detectors
+        On CUDA the frame is uploaded once and resized/colour-swapped on the GPU,
+        returning a (3, H, W) RGB float tensor in [0, 1]; otherwise a resized BGR array
+        """
+        if self.gpu_preprocess:
             target_width, target_height = self.target_size
+            tensor = torch.from_numpy(frame).to('cuda', non_blocking=True)
+            tensor = tensor.permute(2, 0, 1).unsqueeze(0).float()  # HWC -> NCHW (still BGR)
+            tensor = torch.nn.functional.interpolate(
+                tensor, size=(target_height, target_width), mode='bilinear', align_corners=False
+            )
+            # Swap BGR -> RGB on the downscaled tensor rather than the full-resolution upload
+            return tensor.squeeze(0).flip(0).div_(255.0)
+        
+        return cv2.resize(frame, self.target_size, interpolation=cv2.INTER_LINEAR)
+    
+    def _run_detr(self, frames: List, detr_threshold: float) -> List[List[Dict]]:
+        """
+        Run DETR over a batch of preprocessed frames in one forward pass
+        Returns pipeline-style detections ({'score', 'label', 'box'}) per frame
+        """
+        if isinstance(frames[0], torch.Tensor):
+            # GPU-preprocessed frames are already RGB in [0, 1]
+            inputs = self.detr_processor(images=frames, return_tensors="pt", do_rescale=False)
+        else:
+            # Convert BGR to RGB
+            inputs = self.detr_processor(
+                images=[cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames], return_tensors="pt"
+            )
+        inputs = inputs.to(self.detr_device)
+        
+        with torch.inference_mode():
+            outputs = self.detector(
+                pixel_values=inputs["pixel_values"].to(self.detr_dtype),
+                pixel_mask=inputs.get("pixel_mask")
+            )
+        
+        target_width, target_height = self.target_size
+        processed = self.detr_processor.post_process_object_detection(
+            outputs, threshold=detr_threshold, target_sizes=[(target_height, target_width)] * len(frames)
+        )
+        
+        id2label = self.detector.config.id2label
+        return [
+            [
+                {
+                    "score": score,
+                    "label": id2label[label],
+                    "box": {"xmin": box[0], "ymin": box[1], "xmax": box[2], "ymax": box[3]}
+                }
+                for score, label, box in zip(r["scores"].tolist(), r["labels"].tolist(), r["boxes"].tolist())
+            ]
+            for r in processed
+        ]
+    
+    async def _batch_worker(self):
+        """
+        Background task pulling up to max_batch_size queued frames
+        and running them through the weapon detectors in one pass
+        """
+        queue = self._batch_queue
+        
+        while True:
+            batch = [await queue.get()]
+            deadline = time.monotonic() + self.batch_timeout
             
-            # Calculate resize scale for bbox adjustment
-            self.resize_scale = target_width / original_width
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
             
-            # Resize frame for faster processing
-            resized_frame = cv2.resize(frame, self.target_size, interpolation=cv2.INTER_LINEAR)
+            results = await run_blocking(
+                self._detect_weapons_batch,
+                [frame for frame, _, _ in batch],
+                [escalate for _, escalate, _ in batch]
+            )
             
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+    
+    def _detect_weapons_batch(self, frames: List, escalate: List[bool]) -> List[Dict]:
+        """
+        Run DETR (then YOLOv8 for frames DETR did not flag) over a batch
+        of resized frames, returning one weapon result per frame
+        With the cascade active, DETR only sees frames flagged for escalation
+        YOLOv8 uses the plain threshold as the only detector or as the cascade
+        pre-filter; overruling DETR on a frame it examined needs the stricter one
+        """
+        # Skip timing and message formatting entirely unless DEBUG is enabled
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("[Stream 1] Analyzing %d frame(s) for weapons", len(frames))
+        
+        # Get configured thresholds
+        weapon_config = self.config.weapon_config
+        detr_threshold = weapon_config.detr_confidence_threshold
+        yolo_threshold = weapon_config.yolo_confidence_threshold
+        fallback_threshold = min(yolo_threshold * weapon_config.yolo_fallback_threshold_scale, 1.0)
+        
+        results = [None] * len(frames)
+        
+        try:
             # Try DETR first (better for knives)
-            if hasattr(self, 'detector') and self.detector and self.config.weapon_config.detr_enabled:
+            detr_active = bool(self.detector and weapon_config.detr_enabled)
+            cascade = (weapon_config.cascade_enabled
+                       and self.model and weapon_config.yolo_enabled)
+            detr_indices = [i for i in range(len(frames)) if escalate[i] or not cascade]
+            detr_ran = False
+            
+            if detr_indices and detr_active:
                 try:
-                    from PIL import Image
-                    import time
-                    
-                    # Convert BGR to RGB for PIL
-                    frame_rgb = cv2.cvtColor(resized_frame, cv2.COLOR_BGR2RGB)
-                    image = Image.fromarray(frame_rgb)
-                    
-                    start_time = time.time()
+                    start_time = time.time() if debug else 0.0
                     # Using configured threshold
-                    detections = self.detector(image, threshold=detr_threshold)
-                    inference_time = time.time() - start_time
-                    print(f"📊 [Stream 1] DETR Detections: {len(detections)} (inference: {inference_time:.2f}s)")
+                    batch_detections = self._run_detr([frames[i] for i in detr_indices], detr_threshold)
+                    if debug:
+                        logger.debug("[Stream 1] DETR batch of %d (inference: %.2fs)", len(detr_indices), time.time() - start_time)
                     
-                    if detections:
-                        # Filter by configured threshold
-                        valid_detections = [d for d in detections if d['score'] >= detr_threshold]
-                        
-                        if valid_detections:
-                            top_detection = max(valid_detections, key=lambda x: x['score'])
-                            confidence = top_detection['score']
-                            weapon_type = top_detection['label']
-                            bbox = top_detection.get('box', {})
-                            
-                            # FIX: Additional validation - check bounding box size
-                            # Small detections are often false positives
-                            if bbox:
-                                width = bbox.get('xmax', 0) - bbox.get('xmin', 0)
-                                height = bbox.get('ymax', 0) - bbox.get('ymin', 0)
-                                area = width * height
-                                
-                                # Reject very small detections (likely false positives)
-                                # Increased from 500 to 2000 to filter out small noise
-                                if area < 2000:
-                                    print(f"⚠️ [Stream 1] Detection too small (area: {area:.0f}), ignoring")
-                                    # Continue to YOLO fallback instead of raising error?
-                                    # raise ValueError("Detection area too small")
-                                    pass
-                                else:
-
-                                    weapon_map = {
-                                        'LABEL_0': 'knife', 'LABEL_1': 'pistol',
-                                        'LABEL_2': 'rifle', 'LABEL_3': 'knife',
-                                        'knife': 'knife', 'pistol': 'pistol',
-                                        'gun': 'pistol', 'rifle': 'rifle'
-                                    }
-                                    
-                                    clean_weapon = weapon_map.get(weapon_type.lower(), weapon_type)
-                                    
-                                    # Only reject if the label wasn't in the weapon_map (truly unmapped)
-                                    if weapon_type.lower() not in weapon_map:
-                                        print(f"⚠️ [Stream 1] Unknown label {weapon_type}, might be false positive")
-                                        # Still allow it, just mark as 'unknown weapon'
-                                        clean_weapon = 'unknown weapon'
-                                    
-                                    confidence_percent = round(float(confidence) * 100)
-                                    
-                                    print(f"🚨 [Stream 1] WEAPON ALERT: {clean_weapon} ({confidence_percent}%)")
-                                    
-                                    return {
-                                        "detected": True,
-                                        "type": "weapon",
-                                        "weapon_type": clean_weapon,
-                                        "confidence": round(float(confidence), 3),
-                                        "description": f"⚠️ Weapon detected: {clean_weapon} ({confidence_percent}%)",
-                                        "model": "DETR"
-                                    }
+                    for i, detections in zip(detr_indices, batch_detections):
+                        results[i] = self._parse_detr_detections(detections, detr_threshold)
+                    detr_ran = True
                 except Exception as e:
-                    print(f"⚠️ [Stream 1] DETR failed: {e}")
+                    logger.warning("[Stream 1] DETR failed: %s", e)
+            
+            # Threshold YOLOv8 must clear per frame: stricter only when it second-guesses DETR
+            # (the scaled threshold can reach 1.0, so it must never gate escalation)
+            detr_frames = set(detr_indices)
+            thresholds = {}
+            for i, result in enumerate(results):
+                if result is not None:
+                    continue
+                if detr_ran and i in detr_frames:
+                    # DETR saw nothing here; YOLOv8 may only overrule it when allowed
+                    if weapon_config.use_yolo_fallback:
+                        thresholds[i] = fallback_threshold
+                else:
+                    # Only detector, or cascade pre-filter (a hit there just escalates the camera
+                    # to DETR; analyze_frame keeps it at "validating" until confirmed)
+                    thresholds[i] = yolo_threshold
             
-            # Fallback to YOLOv8
-            if self.model and self.config.weapon_config.yolo_enabled:
-                # ⚡ OPTIMIZATION: Use resized frame and imgsz parameter for faster inference
-                import time
-                start_time = time.time()
-                # Using configured threshold
-                results = self.model(resized_frame, conf=yolo_threshold, verbose=False, imgsz=640)
-                inference_time = time.time() - start_time
-                detections = results[0]
-                print(f"📊 [Stream 1] YOLOv8 Detections: {len(detections.boxes)} (inference: {inference_time:.2f}s)")
+            # Fallback to YOLOv8 for frames DETR did not flag
+            pending = list(thresholds)
+            if pending and self.model and weapon_config.yolo_enabled:
+                # ⚡ OPTIMIZATION: Use resized frames and imgsz parameter for faster inference
+                yolo_input = [frames[i] for i in pending]
+                if isinstance(yolo_input[0], torch.Tensor):
+                    # GPU-preprocessed frames go straight in as one BCHW RGB tensor
+                    yolo_input = torch.stack(yolo_input)
                 
-                if len(detections.boxes) > 0:
-                    valid_detections = []
-                    for box in detections.boxes:
-                        conf = float(box.conf[0])
-                        # Filter by configured threshold
-                        if conf >= yolo_threshold:
-                            class_id = int(box.cls[0])
-                            class_name = detections.names[class_id]
-                            valid_detections.append({'class': class_name, 'confidence': conf})
-                    
-                    if valid_detections:
-                        top_weapon = max(valid_detections, key=lambda x: x['confidence'])
-                        confidence = top_weapon['confidence']
-                        weapon_type = top_weapon['class']
-                        confidence_percent = round(float(confidence) * 100)
-                        
-                        print(f"🚨 [Stream 1] WEAPON ALERT: {weapon_type} ({confidence_percent}%)")
-                        
-                        return {
-                            "detected": True,
-                            "type": "weapon",
-                            "weapon_type": weapon_type,
-                            "confidence": round(confidence, 3),
-                            "description": f"⚠️ Weapon detected: {weapon_type} ({confidence_percent}%)",
-                            "model": "YOLOv8"
-                        }
+                start_time = time.time() if debug else 0.0
+                # NMS keeps boxes down to the loosest per-frame threshold; parsing applies each frame's own
+                yolo_detections = self._run_yolo(yolo_input, min(thresholds.values()))
+                if debug:
+                    logger.debug("[Stream 1] YOLOv8 batch of %d (inference: %.2fs)", len(pending), time.time() - start_time)
+                
+                for i, (confidences, class_ids, boxes) in zip(pending, yolo_detections):
+                    results[i] = self._parse_yolo_result(confidences, class_ids, boxes, thresholds[i])
             
-            print("✅ [Stream 1] No weapons detected")
-            return {
-                "detected": False,
-                "type": "normal",
-                "confidence": 0.0,
-                "description": "No weapons detected",
-                "model": "DETR/YOLOv8"
-            }
+            for i, result in enumerate(results):
+                if result is None:
+                    results[i] = {
+                        "detected": False,
+                        "type": "normal",
+                        "confidence": 0.0,
+                        "description": "No weapons detected",
+                        "model": "DETR/YOLOv8"
+                    }
+            
+            return results
             
         except Exception as e:
-            print(f"❌ [Stream 1] Weapon detection error: {e}")
-            return {
+            logger.error("[Stream 1] Weapon detection error: %s", e)
+            return [{
                 "detected": False,
                 "type": "error",
                 "confidence": 0.0,
                 "description": f"Weapon detection error: {str(e)}"
-            }
+            } for _ in frames]
+    
+    def _parse_detr_detections(self, detections: List[Dict], detr_threshold: float) -> Optional[Dict]:
+        """Turn DETR detections for one frame into a weapon result, or None"""
+        if not detections:
+            return None
+        
+        # Filter by configured threshold
+        valid_detections = [d for d in detections if d['score'] >= detr_threshold]
+        if not valid_detections:
+            return None
+        
+        top_detection = max(valid_detections, key=lambda x: x['score'])
+        confidence = top_detection['score']
+        weapon_type = top_detection['label']
+        bbox = top_detection.get('box', {})
+        
+        # FIX: Additional validation - check bounding box size
+        # Small detections are often false positives
+        if not bbox:
+            return None
+        
+        width = bbox.get('xmax', 0) - bbox.get('xmin', 0)
+        height = bbox.get('ymax', 0) - bbox.get('ymin', 0)
+        area = width * height
+        
+        # Reject very small detections (likely false positives)
+        if area < self.MIN_DETECTION_AREA:
+            logger.debug("[Stream 1] Detection too small (area: %.0f), ignoring", area)
+            # Continue to YOLO fallback
+            return None
+        
+        # Unmapped labels are still allowed, just marked as 'unknown weapon'
+        clean_weapon = self.WEAPON_MAP.get(weapon_type.lower(), 'unknown weapon')
+        if clean_weapon == 'unknown weapon':
+            logger.warning("[Stream 1] Unknown label %s, might be false positive", weapon_type)
+        
+        confidence_percent = round(float(confidence) * 100)
+        
+        logger.warning("[Stream 1] WEAPON ALERT: %s (%d%%)", clean_weapon, confidence_percent)
+        
+        return {
+            "detected": True,
+            "type": "weapon",
+            "weapon_type": clean_weapon,
+            "confidence": round(float(confidence), 3),
+            "description": f"⚠️ Weapon detected: {clean_weapon} ({confidence_percent}%)",
+            "bbox": bbox,
+            "model": "DETR"
+        }
+    
+    def _run_yolo(self, yolo_input, yolo_threshold: float) -> List:
+        """
+        Run YOLOv8 over a batch, returning (confidences, class_ids, boxes) per frame
+        Boxes are xyxy in target_size coordinates
+        A single GPU-preprocessed frame replays the captured CUDA graph when available
+        """
+        if self._cuda_graph is not None and isinstance(yolo_input, torch.Tensor) and yolo_input.shape[0] == 1:
+            self._graph_input.copy_(yolo_input)
+            self._cuda_graph.replay()
+            # Clone so NMS never reads the static buffer while it is being overwritten
+            boxes = ops.non_max_suppression(self._graph_output.clone(), conf_thres=yolo_threshold)[0]
+            return [(boxes[:, 4].tolist(), boxes[:, 5].tolist(), boxes[:, :4].tolist())]
+        
+        with self._yolo_autocast():
+            yolo_results = self.model(yolo_input, conf=yolo_threshold, verbose=False, imgsz=640)
+        return [(r.boxes.conf.tolist(), r.boxes.cls.tolist(), r.boxes.xyxy.tolist()) for r in yolo_results]
+    
+    def _yolo_autocast(self):
+        """FP16 autocast context for the PyTorch YOLOv8 path (no-op otherwise)"""
+        return torch.autocast(device_type='cuda', dtype=torch.float16, enabled=self.yolo_amp)
+    
+    def _parse_yolo_result(self, confidences: List[float], class_ids: List[float], boxes: List[List[float]],
+                           yolo_threshold: float) -> Optional[Dict]:
+        """Turn YOLOv8 detections for one frame into a weapon result, or None"""
+        if not confidences:
+            return None
+        
+        valid_detections = []
+        for conf, class_id, box in zip(confidences, class_ids, boxes):
+            # Filter by configured threshold
+            if conf >= yolo_threshold:
+                class_name = self.model.names[int(class_id)]
+                valid_detections.append({'class': class_name, 'confidence': conf, 'box': box})
+        
+        if not valid_detections:
+            return None
+        
+        top_weapon = max(valid_detections, key=lambda x: x['confidence'])
+        confidence = top_weapon['confidence']
+        weapon_type = top_weapon['class']
+        confidence_percent = round(float(confidence) * 100)
+        
+        logger.warning("[Stream 1] WEAPON ALERT: %s (%d%%)", weapon_type, confidence_percent)
+        
+        return {
+            "detected": True,
+            "type": "weapon",
+            "weapon_type": weapon_type,
+            "confidence": round(confidence, 3),
+            "description": f"⚠️ Weapon detected: {weapon_type} ({confidence_percent}%)",
+            "bbox": dict(zip(('xmin', 'ymin', 'xmax', 'ymax'), top_weapon['box'])),
+            "model": "YOLOv8"
+        }
     
     def get_detector_status(self) -> Dict:
         """Get current status of all detectors"""
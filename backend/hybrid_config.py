@@ -3,11 +3,25 @@ Hybrid Detection System Configuration
 Centralized configuration for both weapon and violence detection streams
 """
 
-from dataclasses import dataclass
-from typing import Dict, List
+import functools
+import textwrap
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+from typing import Dict, List, Mapping
 
+from .log_config import get_logger
 
-@dataclass
+logger = get_logger(__name__)
+
+
+def _cache_fields(cls):
+    """Store the dataclass field names on the class once for to_dict"""
+    cls._FIELDS = tuple(f.name for f in fields(cls))
+    return cls
+
+
+@_cache_fields
+@dataclass(slots=True, frozen=True)
 class WeaponDetectionConfig:
     """Configuration for weapon detection (Stream 1)"""
     
@@ -21,25 +35,23 @@ class WeaponDetectionConfig:
     yolo_confidence_threshold: float = 0.75
     yolo_enabled: bool = True
     yolo_fallback: bool = True  # Use YOLOv8n if custom weights missing
+    yolo_int8_calibration_data: str = ""  # Dataset YAML of ~500 CCTV frames; enables INT8 TensorRT engine
+    yolo_int8_max_map_drop: float = 0.01  # Keep FP16 engine if INT8 mAP drops more than this
+    yolo_cuda_graph: bool = False  # Replay PyTorch YOLOv8 forward as a CUDA graph (fixed 640x480, batch=1)
+    cascade_enabled: bool = True  # YOLOv8 pre-filters idle frames; DETR only confirms once YOLOv8 fires
+    use_yolo_fallback: bool = True  # Let YOLOv8 alert on frames DETR ran on but did not flag
+    yolo_fallback_threshold_scale: float = 1.2  # YOLOv8 needs threshold x this (capped at 1.0) to overrule DETR
     
     # Processing Settings
     inference_device: str = "cuda"  # 'cuda' or 'cpu'
     
     def to_dict(self) -> Dict:
         """Convert to dictionary"""
-        return {
-            "detr_model_name": self.detr_model_name,
-            "detr_confidence_threshold": self.detr_confidence_threshold,
-            "detr_enabled": self.detr_enabled,
-            "yolo_weights_path": self.yolo_weights_path,
-            "yolo_confidence_threshold": self.yolo_confidence_threshold,
-            "yolo_enabled": self.yolo_enabled,
-            "yolo_fallback": self.yolo_fallback,
-            "inference_device": self.inference_device
-        }
+        return {name: getattr(self, name) for name in self._FIELDS}
 
 
-@dataclass
+@_cache_fields
+@dataclass(slots=True, frozen=True)
 class ViolenceDetectionConfig:
     """Configuration for violence detection (Stream 2)"""
     
@@ -54,6 +66,7 @@ class ViolenceDetectionConfig:
     confidence_threshold: float = 0.60
     inference_device: str = "cuda"  # 'cuda' or 'cpu'
     enabled: bool = False  # FIX: DISABLED by default - model is untrained
+    checkpoint_path: str = ""  # Trained CNN-LSTM state_dict; inference stays off until one is set
     
     # Model Architecture
     use_bidirectional: bool = True
@@ -62,22 +75,11 @@ class ViolenceDetectionConfig:
     
     def to_dict(self) -> Dict:
         """Convert to dictionary"""
-        return {
-            "lstm_hidden_size": self.lstm_hidden_size,
-            "lstm_num_layers": self.lstm_num_layers,
-            "sequence_length": self.sequence_length,
-            "input_size": self.input_size,
-            "frame_skip": self.frame_skip,
-            "confidence_threshold": self.confidence_threshold,
-            "inference_device": self.inference_device,
-            "enabled": self.enabled,
-            "use_bidirectional": self.use_bidirectional,
-            "use_attention": self.use_attention,
-            "dropout_rate": self.dropout_rate
-        }
+        return {name: getattr(self, name) for name in self._FIELDS}
 
 
-@dataclass
+@_cache_fields
+@dataclass(slots=True, frozen=True)
 class FusionConfig:
     """Configuration for detection fusion"""
     
@@ -96,18 +98,11 @@ class FusionConfig:
     
     def to_dict(self) -> Dict:
         """Convert to dictionary"""
-        return {
-            "fusion_mode": self.fusion_mode,
-            "weapon_threshold": self.weapon_threshold,
-            "violence_threshold": self.violence_threshold,
-            "enable_alerts": self.enable_alerts,
-            "alert_cooldown_seconds": self.alert_cooldown_seconds,
-            "log_all_detections": self.log_all_detections,
-            "log_level": self.log_level
-        }
+        return {name: getattr(self, name) for name in self._FIELDS}
 
 
-@dataclass
+@_cache_fields
+@dataclass(slots=True, frozen=True)
 class VideoProcessorConfig:
     """Configuration for video processing"""
     
@@ -124,13 +119,66 @@ class VideoProcessorConfig:
     
     def to_dict(self) -> Dict:
         """Convert to dictionary"""
-        return {
-            "process_frequency": self.process_frequency,
-            "fps": self.fps,
-            "save_alert_frames": self.save_alert_frames,
-            "alert_frames_path": self.alert_frames_path,
-            "log_to_database": self.log_to_database
-        }
+        return {name: getattr(self, name) for name in self._FIELDS}
+
+
+def _balanced_preset():
+    """Default thresholds"""
+    return (
+        WeaponDetectionConfig(),
+        ViolenceDetectionConfig(
+            enabled=False  # FIX: Disabled - untrained model
+        ),
+        FusionConfig()
+    )
+
+
+def _high_security_preset():
+    """Lower thresholds, every frame analyzed"""
+    return (
+        WeaponDetectionConfig(
+            detr_confidence_threshold=0.70,
+            yolo_confidence_threshold=0.70
+        ),
+        ViolenceDetectionConfig(
+            confidence_threshold=0.50,
+            frame_skip=1,  # Process every frame
+            enabled=False  # FIX: Disabled - untrained model
+        ),
+        FusionConfig(
+            fusion_mode="aggressive",
+            weapon_threshold=0.70,
+            violence_threshold=0.50
+        )
+    )
+
+
+def _low_false_positives_preset():
+    """Higher thresholds, conservative fusion"""
+    return (
+        WeaponDetectionConfig(
+            detr_confidence_threshold=0.85,  # FIX: Adjusted to 85%
+            yolo_confidence_threshold=0.85   # FIX: Adjusted to 85%
+        ),
+        ViolenceDetectionConfig(
+            confidence_threshold=0.75,
+            frame_skip=4,  # Process less frequently
+            enabled=False  # FIX: Disabled - untrained model
+        ),
+        FusionConfig(
+            fusion_mode="conservative",
+            weapon_threshold=0.85,  # FIX: Adjusted to 85%
+            violence_threshold=0.75
+        )
+    )
+
+
+# Preset name -> factory returning (weapon, violence, fusion) configs
+_PRESETS = {
+    "balanced": _balanced_preset,
+    "high_security": _high_security_preset,
+    "low_false_positives": _low_false_positives_preset
+}
 
 
 class HybridSystemConfig:
@@ -145,100 +193,65 @@ class HybridSystemConfig:
         """
         self.preset = preset
         
-        # Load preset configuration
-        if preset == "high_security":
-            self.weapon_config = WeaponDetectionConfig(
-                detr_confidence_threshold=0.70,
-                yolo_confidence_threshold=0.70
-            )
-            self.violence_config = ViolenceDetectionConfig(
-                confidence_threshold=0.50,
-                frame_skip=1,  # Process every frame
-                enabled=False  # FIX: Disabled - untrained model
-            )
-            self.fusion_config = FusionConfig(
-                fusion_mode="aggressive",
-                weapon_threshold=0.70,
-                violence_threshold=0.50
-            )
-        
-        elif preset == "low_false_positives":
-            self.weapon_config = WeaponDetectionConfig(
-                detr_confidence_threshold=0.85,  # FIX: Adjusted to 85%
-                yolo_confidence_threshold=0.85   # FIX: Adjusted to 85%
-            )
-            self.violence_config = ViolenceDetectionConfig(
-                confidence_threshold=0.75,
-                frame_skip=4,  # Process less frequently
-                enabled=False  # FIX: Disabled - untrained model
-            )
-            self.fusion_config = FusionConfig(
-                fusion_mode="conservative",
-                weapon_threshold=0.85,  # FIX: Adjusted to 85%
-                violence_threshold=0.75
-            )
-        
-        else:  # balanced (default)
-            self.weapon_config = WeaponDetectionConfig()
-            self.violence_config = ViolenceDetectionConfig(
-                enabled=False  # FIX: Disabled - untrained model
-            )
-            self.fusion_config = FusionConfig()
+        # Load preset configuration (unknown presets fall back to balanced)
+        self.weapon_config, self.violence_config, self.fusion_config = _PRESETS.get(preset, _balanced_preset)()
         
         # Video processor always uses these settings
         self.video_config = VideoProcessorConfig()
-    
-    def get_full_config(self) -> Dict:
-        """Get complete configuration as dictionary"""
-        return {
+        
+        # Configs are frozen, so the dictionary view is built once
+        self._full_config = MappingProxyType({
             "preset": self.preset,
-            "weapon_detection": self.weapon_config.to_dict(),
-            "violence_detection": self.violence_config.to_dict(),
-            "fusion": self.fusion_config.to_dict(),
-            "video_processing": self.video_config.to_dict()
-        }
+            "weapon_detection": MappingProxyType(self.weapon_config.to_dict()),
+            "violence_detection": MappingProxyType(self.violence_config.to_dict()),
+            "fusion": MappingProxyType(self.fusion_config.to_dict()),
+            "video_processing": MappingProxyType(self.video_config.to_dict())
+        })
+    
+    def get_full_config(self) -> Mapping:
+        """Get complete configuration as a read-only mapping (cached)"""
+        return self._full_config
     
     def print_config(self):
-        """Print configuration nicely"""
-        print("\n" + "=" * 60)
-        print(f"HYBRID SURVEILLANCE SYSTEM - Configuration")
-        print(f"Preset: {self.preset.upper()}")
-        print("=" * 60)
-        
-        print("\n📊 WEAPON DETECTION (Stream 1)")
-        print(f"  Model: {self.weapon_config.detr_model_name}")
-        print(f"  DETR Threshold: {self.weapon_config.detr_confidence_threshold:.0%}")
-        print(f"  YOLOv8 Threshold: {self.weapon_config.yolo_confidence_threshold:.0%}")
-        print(f"  Device: {self.weapon_config.inference_device}")
-        
-        print("\n🧠 VIOLENCE DETECTION (Stream 2)")
-        print(f"  Model: CNN-LSTM")
-        print(f"  Sequence Length: {self.violence_config.sequence_length} frames")
-        print(f"  Confidence Threshold: {self.violence_config.confidence_threshold:.0%}")
-        print(f"  Frame Skip: Every {self.violence_config.frame_skip} frame(s)")
-        print(f"  Device: {self.violence_config.inference_device}")
-        print(f"  Enabled: {self.violence_config.enabled}")
-        
-        print("\n🔀 FUSION ENGINE")
-        print(f"  Mode: {self.fusion_config.fusion_mode.upper()}")
-        print(f"  Weapon Threshold: {self.fusion_config.weapon_threshold:.0%}")
-        print(f"  Violence Threshold: {self.fusion_config.violence_threshold:.0%}")
-        print(f"  Alert Cooldown: {self.fusion_config.alert_cooldown_seconds}s")
-        
-        print("\n📹 VIDEO PROCESSING")
-        print(f"  Process Frequency: Every {self.video_config.process_frequency} frame(s)")
-        print(f"  Save Evidence: {self.video_config.save_alert_frames}")
-        print(f"  Database Logging: {self.video_config.log_to_database}")
-        
-        print("\n" + "=" * 60 + "\n")
+        """Print configuration nicely (rendered once, emitted as a single log record)"""
+        weapon, violence, fusion, video = self.weapon_config, self.violence_config, self.fusion_config, self.video_config
+        logger.info(textwrap.dedent(f"""
+            {"=" * 60}
+            HYBRID SURVEILLANCE SYSTEM - Configuration
+            Preset: {self.preset.upper()}
+            {"=" * 60}
+            
+            📊 WEAPON DETECTION (Stream 1)
+              Model: {weapon.detr_model_name}
+              DETR Threshold: {weapon.detr_confidence_threshold:.0%}
+              YOLOv8 Threshold: {weapon.yolo_confidence_threshold:.0%}
+              Device: {weapon.inference_device}
+            
+            🧠 VIOLENCE DETECTION (Stream 2)
+              Model: CNN-LSTM
+              Sequence Length: {violence.sequence_length} frames
+              Confidence Threshold: {violence.confidence_threshold:.0%}
+              Frame Skip: Every {violence.frame_skip} frame(s)
+              Device: {violence.inference_device}
+              Enabled: {violence.enabled}
+            
+            🔀 FUSION ENGINE
+              Mode: {fusion.fusion_mode.upper()}
+              Weapon Threshold: {fusion.weapon_threshold:.0%}
+              Violence Threshold: {fusion.violence_threshold:.0%}
+              Alert Cooldown: {fusion.alert_cooldown_seconds}s
+            
+            📹 VIDEO PROCESSING
+              Process Frequency: Every {video.process_frequency} frame(s)
+              Save Evidence: {video.save_alert_frames}
+              Database Logging: {video.log_to_database}
+            
+            {"=" * 60}
+            """))
 
 
-# Predefined configurations
-SYSTEM_CONFIGS = {
-    "balanced": HybridSystemConfig("balanced"),
-    "high_security": HybridSystemConfig("high_security"),
-    "low_false_positives": HybridSystemConfig("low_false_positives")
-}
+# Predefined configurations (built lazily on first use)
+SYSTEM_PRESETS = tuple(_PRESETS)
 
 
 def get_system_config(preset: str = "balanced") -> HybridSystemConfig:
@@ -249,10 +262,15 @@ def get_system_config(preset: str = "balanced") -> HybridSystemConfig:
         preset: 'balanced', 'high_security', or 'low_false_positives'
     
     Returns:
-        HybridSystemConfig instance
+        HybridSystemConfig instance (shared per preset)
     """
-    if preset in SYSTEM_CONFIGS:
-        return SYSTEM_CONFIGS[preset]
-    else:
-        print(f"⚠️ Unknown preset '{preset}', using 'balanced'")
-        return SYSTEM_CONFIGS["balanced"]
+    if preset not in SYSTEM_PRESETS:
+        logger.warning("⚠️ Unknown preset '%s', using 'balanced'", preset)
+        preset = "balanced"
+    return _build_system_config(preset)
+
+
+@functools.cache
+def _build_system_config(preset: str) -> HybridSystemConfig:
+    """Construct a preset on first request and memoize it"""
+    return HybridSystemConfig(preset)
@@ -0,0 +1,78 @@
+"""
+Logging Configuration
+Non-blocking logging for the detection hot path: records are put on a queue
+and written to stdout by a QueueListener on a background thread
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import time
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+_listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a logger under the 'backend' hierarchy
+    The shared QueueHandler/QueueListener pair is installed on first use
+    
+    Args:
+        name: Module name (typically __name__)
+    """
+    global _listener
+    backend_logger = logging.getLogger("backend")
+    
+    if _listener is None:
+        log_queue = queue.SimpleQueue()
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter("%(message)s"))
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        _listener.start()
+        atexit.register(_listener.stop)
+        
+        backend_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        backend_logger.setLevel(LOG_LEVEL)
+        backend_logger.propagate = False
+    
+    return backend_logger.getChild(name.rsplit(".", 1)[-1])
+
+
+class RateLimitedLogger:
+    """
+    Drop records beyond `hz` per second so bursts (e.g. alert storms) can't flood the log
+    Arguments use %-style formatting, deferred until a record is actually emitted
+    """
+    
+    __slots__ = ("logger", "interval", "_last", "_suppressed")
+    
+    def __init__(self, logger: logging.Logger, hz: float = 5.0):
+        """
+        Args:
+            logger: Logger that receives the records that pass
+            hz: Maximum records per second
+        """
+        self.logger = logger
+        self.interval = 1.0 / hz
+        self._last = float("-inf")
+        self._suppressed = 0
+    
+    def log(self, level: int, msg: str, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            self._suppressed += 1
+            return
+        self._last = now
+        if self._suppressed:
+            msg = f"{msg} (+{self._suppressed} suppressed)"
+            self._suppressed = 0
+        self.logger.log(level, msg, *args)
+    
+    def info(self, msg: str, *args):
+        self.log(logging.INFO, msg, *args)
@@ -3,27 +3,62 @@ import os
 
 load_dotenv()
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, File, UploadFile
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, File, UploadFile, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import asyncio
-import json
-import cv2
-import numpy as np
+import orjson
+import xxhash
 from .video_processor import video_processor
-from .database import init_db, get_incidents, log_incident
-from .detection_engine import detection_engine
+from .database import init_db, close_db, get_incidents, log_incident
+from .detection_engine import detection_engine, run_blocking
 from .hybrid_config import get_system_config
+from .jpeg_codec import decode_jpeg, image_size, save_bytes, save_jpeg
+from .shared_cache import SharedResultCache
+from .log_config import get_logger
 import time
+import weakref
+from collections import OrderedDict
+
+logger = get_logger(__name__)
 
 # Load hybrid system configuration
 SYSTEM_CONFIG = get_system_config("low_false_positives")  # Can be 'balanced', 'high_security', 'low_false_positives'
 
 # ⚡ OPTIMIZATION: Result caching to avoid duplicate processing
-last_frame_hash = None
-last_result = None
-last_result_time = 0
+# Small LRU keyed by frame hash so several cameras don't evict each other
+_result_cache = OrderedDict()  # frame_hash -> (result_time, result)
 CACHE_DURATION = 0.1  # Cache for 100ms to avoid redundant processing
+CACHE_MAX_ENTRIES = 16
+
+# With several uvicorn workers, share recent results so a duplicate frame routed
+# to another worker is not decoded and analyzed again. The launcher below creates
+# the segment when WEB_CONCURRENCY > 1 and hands its name to the workers; a bare
+# `uvicorn --workers N` runs without it
+SHARED_CACHE_ENV = "VD_SHARED_CACHE"
+_shared_cache = SharedResultCache(os.environ[SHARED_CACHE_ENV]) if os.getenv(SHARED_CACHE_ENV) else None
+
+
+def _cache_get(frame_hash, now):
+    """Return a fresh (result_time, result) for frame_hash, or None"""
+    entry = _result_cache.get(frame_hash)
+    if entry is None:
+        return _shared_cache.get(frame_hash, now, CACHE_DURATION) if _shared_cache else None
+    if now - entry[0] >= CACHE_DURATION:
+        del _result_cache[frame_hash]
+        return None
+    _result_cache.move_to_end(frame_hash)
+    return entry
+
+
+def _cache_put(frame_hash, now, result):
+    """Store a result, evicting the least recently used entry past CACHE_MAX_ENTRIES"""
+    _result_cache[frame_hash] = (now, result)
+    _result_cache.move_to_end(frame_hash)
+    if len(_result_cache) > CACHE_MAX_ENTRIES:
+        _result_cache.popitem(last=False)
+    if _shared_cache:
+        _shared_cache.put(frame_hash, now, result)
 
 app = FastAPI(
     title="Real-Time Violence Detection System",
@@ -45,33 +80,65 @@ if not os.path.exists("alerts"):
 
 app.mount("/alerts", StaticFiles(directory="alerts"), name="alerts")
 
-connected_clients = set()
+# Weak references: sockets that die without a clean disconnect don't leak
+connected_clients = weakref.WeakSet()
+HEARTBEAT_INTERVAL = 30  # Seconds between liveness probes
+HEARTBEAT_MESSAGE = orjson.dumps({"type": "heartbeat"}).decode()
+_heartbeat_task = None
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize system on startup"""
+    global _heartbeat_task
     await init_db()
+    _heartbeat_task = asyncio.create_task(_heartbeat())
     
-    print("\n" + "="*70)
-    print("🚀 REAL-TIME SURVEILLANCE SYSTEM - STARTING UP")
-    print("="*70)
+    logger.info("\n%s\n🚀 REAL-TIME SURVEILLANCE SYSTEM - STARTING UP\n%s", "=" * 70, "=" * 70)
     
     # Print configuration
     SYSTEM_CONFIG.print_config()
     
-    print("✅ Backend Initialized")
-    print("✅ Weapon Detection: ACTIVE (Stream 1)")
-    print("✅ Violence Detection: ACTIVE (Stream 2)" if SYSTEM_CONFIG.violence_config.enabled else "⚠️  Violence Detection: DISABLED")
-    print("✅ Detection Fusion: ACTIVE")
-    print("\n📡 WebSocket server ready at: ws://localhost:8000/ws")
-    print("🎥 Ready to receive video streams\n")
+    logger.info("✅ Backend Initialized")
+    logger.info("✅ Weapon Detection: ACTIVE (Stream 1)")
+    logger.info("✅ Violence Detection: ACTIVE (Stream 2)" if SYSTEM_CONFIG.violence_config.enabled else "⚠️  Violence Detection: DISABLED")
+    logger.info("✅ Detection Fusion: ACTIVE")
+    logger.info("\n📡 WebSocket server ready at: ws://localhost:8000/ws")
+    logger.info("🎥 Ready to receive video streams\n")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release per-worker resources"""
+    # Write out incidents still queued for MongoDB before the loop stops
+    await close_db()
+    if _shared_cache:
+        _shared_cache.close()
+
+
+async def _send_to_client(client: WebSocket, message: str):
+    """Send one pre-encoded message; a failing client is dropped without cancelling the broadcast"""
+    try:
+        await client.send_text(message)
+    except Exception:
+        connected_clients.discard(client)
+
+
+async def _heartbeat():
+    """Periodically probe clients so broken sockets are dropped"""
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        for client in list(connected_clients):
+            await _send_to_client(client, HEARTBEAT_MESSAGE)
 
 
 async def broadcast_alert(alert_data):
     """Broadcast alert to all connected WebSocket clients"""
     if connected_clients:
-        message = json.dumps(alert_data)
-        await asyncio.gather(*[client.send_text(message) for client in connected_clients], return_exceptions=True)
+        # Encode once for every client (text frames - the dashboard JSON.parses them)
+        message = orjson.dumps(alert_data, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+        async with asyncio.TaskGroup() as tg:
+            for client in list(connected_clients):
+                tg.create_task(_send_to_client(client, message))
 
 
 @app.websocket("/ws")
@@ -79,33 +146,47 @@ async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time alerts"""
     await websocket.accept()
     connected_clients.add(websocket)
-    print(f"🔗 WebSocket client connected. Total clients: {len(connected_clients)}")
+    logger.info("🔗 WebSocket client connected. Total clients: %d", len(connected_clients))
     
     try:
         while True:
             # Receive and ignore client messages (keep connection alive)
             await websocket.receive_text()
     except WebSocketDisconnect:
-        connected_clients.remove(websocket)
-        print(f"🔌 WebSocket client disconnected. Total clients: {len(connected_clients)}")
+        logger.info("🔌 WebSocket client disconnected. Total clients: %d", len(connected_clients) - 1)
+    finally:
+        connected_clients.discard(websocket)
+
+
+# ⚡ OPTIMIZATION: Dashboards poll /status; serve pre-encoded JSON for up to 1s
+_status_bytes = None
+_status_expires_at = 0.0
+STATUS_CACHE_SECONDS = 1.0
 
 
 @app.get("/status")
 async def system_status():
     """Get current system status"""
-    detector_status = detection_engine.get_detector_status()
-    video_stats = video_processor.get_stats()
+    global _status_bytes, _status_expires_at
+    
+    now = time.monotonic()
+    if _status_bytes is None or now >= _status_expires_at:
+        detector_status = detection_engine.get_detector_status()
+        video_stats = video_processor.get_stats()
+        
+        _status_bytes = orjson.dumps({
+            "system": "HYBRID_SURVEILLANCE",
+            "status": "operational",
+            "detection_mode": "Weapon + Behavioral Violence",
+            "configuration": SYSTEM_CONFIG.preset,
+            "detector_status": detector_status,
+            "video_processor": video_stats,
+            "connected_clients": len(connected_clients),
+            "system_config": SYSTEM_CONFIG.get_full_config()
+        }, default=dict, option=orjson.OPT_SERIALIZE_NUMPY)  # default=dict unwraps the read-only config mappings
+        _status_expires_at = now + STATUS_CACHE_SECONDS
     
-    return {
-        "system": "HYBRID_SURVEILLANCE",
-        "status": "operational",
-        "detection_mode": "Weapon + Behavioral Violence",
-        "configuration": SYSTEM_CONFIG.preset,
-        "detector_status": detector_status,
-        "video_processor": video_stats,
-        "connected_clients": len(connected_clients),
-        "system_config": SYSTEM_CONFIG.get_full_config()
-    }
+    return Response(content=_status_bytes, media_type="application/json")
 
 
 @app.get("/incidents")
@@ -116,57 +197,58 @@ async def get_history():
 @app.post("/analyze-frame")
 async def analyze_frame(file: UploadFile = File(...)):
     """Analyze a single frame for threats"""
-    global last_frame_hash, last_result, last_result_time
-    
     try:
-        print("📸 Received frame for hybrid analysis")
+        logger.debug("📸 Received frame for hybrid analysis")
         # Read the uploaded image
         contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
         
-        # ⚡ OPTIMIZATION: Hash frame to detect duplicates
-        import hashlib
-        frame_hash = hashlib.md5(nparr).hexdigest()
+        # ⚡ OPTIMIZATION: Hash frame to detect duplicates (non-cryptographic, SIMD xxh3)
+        frame_hash = xxhash.xxh3_64_intdigest(contents)
         
         # Return cached result if same frame received recently
         current_time = time.time()
-        if frame_hash == last_frame_hash and (current_time - last_result_time) < CACHE_DURATION:
-            print(f"⚡ [CACHE HIT] Returning cached result (age: {(current_time - last_result_time)*1000:.0f}ms)")
-            return last_result
+        cached = _cache_get(frame_hash, current_time)
+        if cached is not None:
+            logger.debug("⚡ [CACHE HIT] Returning cached result (age: %.0fms)", (current_time - cached[0]) * 1000)
+            return cached[1]
         
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        frame = await run_blocking(decode_jpeg, contents, detection_engine.target_size)
         
         if frame is None:
-            print("❌ Invalid image received")
+            logger.warning("❌ Invalid image received")
             return {"error": "Invalid image"}
         
-        print(f"✅ Frame decoded: {frame.shape}")
+        logger.debug("✅ Frame decoded: %s", frame.shape)
         
         # Analyze with hybrid detection engine
         # Increment stats so UI shows activity
         video_processor.frame_counter += 1
-        result = await detection_engine.analyze_frame(frame)
+        # decode_jpeg may downscale large uploads; report bboxes in the uploaded image's pixels
+        result = await detection_engine.analyze_frame(frame, source_size=image_size(contents))
         
         # ⚡ OPTIMIZATION: Cache result
-        last_frame_hash = frame_hash
-        last_result = result
-        last_result_time = current_time
+        _cache_put(frame_hash, current_time, result)
         
-        print(f"Detection result: {result}")
+        logger.debug("Detection result: %s", result)
 
         # If analysis failed, return error to frontend without logging incidents
         if result.get("error") or result.get("type") == "error":
-            print("⚠️ Analysis error returned to client")
+            logger.warning("⚠️ Analysis error returned to client")
             return result
         
         # If threat detected, save and log
         if result.get("detected"):
             video_processor.alert_counter += 1
-            print(f"🚨 THREAT DETECTED: {result['type']}")
-            timestamp = cv2.getTickCount()
+            logger.warning("🚨 THREAT DETECTED: %s", result['type'])
+            timestamp = time.time_ns()
             img_name = f"alert_{timestamp}.jpg"
             img_path = os.path.join("alerts", img_name)
-            cv2.imwrite(img_path, frame)
+            # ⚡ OPTIMIZATION: JPEG uploads are stored as received (full resolution, no re-encode);
+            # anything else is encoded once - either way a single write off the event loop
+            if contents[:2] == b"\xff\xd8":
+                await run_blocking(save_bytes, img_path, contents)
+            else:
+                await run_blocking(save_jpeg, img_path, frame)
             
             # Log to database
             await log_incident(
@@ -187,16 +269,36 @@ async def analyze_frame(file: UploadFile = File(...)):
                 "weapon": result.get("weapon", False)
             }
             await broadcast_alert(alert_data)
-            print(f"📡 Alert broadcasted to {len(connected_clients)} clients")
+            logger.info("📡 Alert broadcasted to %d clients", len(connected_clients))
         else:
-            print("✅ No threats detected - normal activity")
+            logger.debug("✅ No threats detected - normal activity")
         
         return result
         
     except Exception as e:
-        print(f"Error analyzing frame: {e}")
+        logger.error("Error analyzing frame: %s", e)
         return {"error": str(e)}
 
 if __name__ == "__main__":
+    import importlib.util
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    
+    # ⚡ OPTIMIZATION: libuv event loop + C HTTP parser when installed (uvloop is not available on Windows)
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    # Each worker loads its own models and WebSocket client set, so scale out deliberately
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    
+    # The launcher owns the shared result cache: workers attach by name and it is unlinked on exit
+    launcher_cache = None
+    if workers > 1:
+        launcher_cache = SharedResultCache(f"vd_results_{os.getpid()}", create=True)
+        os.environ[SHARED_CACHE_ENV] = launcher_cache.name
+    
+    try:
+        uvicorn.run("backend.main:app" if workers > 1 else app, host="0.0.0.0", port=8000,
+                    loop=loop, http=http, workers=workers)
+    finally:
+        if launcher_cache:
+            launcher_cache.close()
+            launcher_cache.unlink()
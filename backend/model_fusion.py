@@ -4,9 +4,35 @@ Combines results from weapon detection and violence detection
 Implements fusion logic for hybrid surveillance system
 """
 
+from dataclasses import dataclass
 from typing import Dict, List, Tuple
 from enum import Enum
 from datetime import datetime
+import math
+import time
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True)
+    def _trend_kernel(det, sev, head, count, window):
+        """Alert count and mean severity over the last min(count, window) ring entries"""
+        n = det.shape[0]
+        k = min(count, window)
+        alerts = 0
+        total = 0.0
+        for i in range(k):
+            j = (head - 1 - i) % n
+            alerts += det[j]
+            total += sev[j]
+        return alerts, total / k
 
 
 class AlertSeverity(Enum):
@@ -18,6 +44,134 @@ class AlertSeverity(Enum):
     NONE = "none"              # Normal
 
 
+class _LazyDescription:
+    """
+    Description template plus arguments, formatted only when str() is called
+    Fused results that are never rendered skip the formatting
+    """
+    __slots__ = ("fmt", "args")
+    
+    def __init__(self, fmt: str, args: tuple):
+        self.fmt = fmt
+        self.args = args
+    
+    def __str__(self) -> str:
+        return self.fmt.format(*self.args)
+
+
+@dataclass(slots=True, frozen=True)
+class FusedResult:
+    """Fused detection result (slotted; converted to a dict at the API/WebSocket boundary)"""
+    detected: bool
+    type: str
+    severity: AlertSeverity
+    severity_score: float
+    description: object  # str or _LazyDescription
+    weapon_detection: Dict
+    violence_detection: Dict
+    confidence: float
+    action: str
+    recommended_response: Tuple[str, ...]
+    
+    def to_dict(self) -> Dict:
+        """Convert to dictionary, rendering the description"""
+        return {
+            "detected": self.detected,
+            "type": self.type,
+            "severity": self.severity,
+            "severity_score": self.severity_score,
+            "description": str(self.description),
+            "weapon_detection": self.weapon_detection,
+            "violence_detection": self.violence_detection,
+            "confidence": self.confidence,
+            "action": self.action,
+            "recommended_response": self.recommended_response
+        }
+
+
+# ⚡ OPTIMIZATION: Constant parts of each fused result, built once at import
+# Handlers pass a base as keyword arguments and fill in only the per-frame fields
+_NOT_DETECTED = {"detected": False}  # Shared placeholder for the inactive stream - never mutate
+
+_CRITICAL_BASE = {
+    "detected": True,
+    "type": "critical_threat",
+    "severity": AlertSeverity.CRITICAL,
+    "severity_score": 1.0,
+    "action": "IMMEDIATE_ALERT",
+    "recommended_response": (
+        "Sound alarm immediately",
+        "Alert security personnel",
+        "Notify law enforcement",
+        "Record all footage"
+    )
+}
+_CRITICAL_FMT = "🚨 CRITICAL: Weapon + Aggressive behavior detected!\n   Weapon: {}\n   Behavior: {}"
+
+_WEAPON_BASE = {
+    "detected": True,
+    "type": "weapon_detected",
+    "severity": AlertSeverity.HIGH,
+    "severity_score": 0.9,
+    "violence_detection": _NOT_DETECTED,
+    "action": "IMMEDIATE_ALERT",
+    "recommended_response": (
+        "Alert security immediately",
+        "Track person with weapon",
+        "Record all angles",
+        "Prepare emergency response"
+    )
+}
+_WEAPON_FMT = "⚠️ HIGH: Weapon detected\n   {}\n   Confidence: {:.1%}"
+
+_VIOLENCE_BASE = {
+    "detected": True,
+    "type": "violence_detected",
+    "severity": AlertSeverity.MEDIUM,
+    "severity_score": 0.7,
+    "weapon_detection": _NOT_DETECTED,
+    "action": "ALERT_AND_MONITOR",
+    "recommended_response": (
+        "Alert security to monitor",
+        "Zoom in for details",
+        "Prepare to intervene if needed",
+        "Record incident"
+    )
+}
+_VIOLENCE_FMT = "⚠️ MEDIUM: Aggressive behavior detected\n   {}\n   Confidence: {:.1%}"
+
+_SUSPICIOUS_BASE = {
+    "detected": True,
+    "type": "suspicious_activity",
+    "severity": AlertSeverity.LOW,
+    "severity_score": 0.4,
+    "weapon_detection": _NOT_DETECTED,
+    "action": "MONITOR",
+    "recommended_response": (
+        "Keep monitoring",
+        "Manual verification recommended",
+        "Check for context clues"
+    )
+}
+_SUSPICIOUS_FMT = "⚠️ LOW: Suspicious activity detected\n   {}\n   Confidence: {:.1%}"
+
+_NORMAL_BASE = {
+    "detected": False,
+    "type": "normal",
+    "severity": AlertSeverity.NONE,
+    "severity_score": 0.0,
+    "description": "✅ Normal activity - No threats detected",
+    "weapon_detection": _NOT_DETECTED,
+    "violence_detection": _NOT_DETECTED,
+    "confidence": 0.0,
+    "action": "NONE",
+    "recommended_response": ()
+}
+
+# ⚡ OPTIMIZATION: Most frames are idle - share one immutable normal result instead of building one per frame
+_NORMAL_RESULT = FusedResult(**_NORMAL_BASE)
+
+
 class DetectionFusionEngine:
     """
     Fusion engine for combining multiple detection streams
@@ -25,6 +179,13 @@ class DetectionFusionEngine:
     - Stream 2: Violence Detection (CNN-LSTM) - Sequence-level
     """
     
+    __slots__ = (
+        "weapon_threshold", "violence_threshold", "fusion_mode",
+        "max_history",
+        "_det", "_sev", "_ts", "_head", "_count", "_wall_offset_ns",
+        "_fuse"
+    )
+    
     def __init__(self, 
                  weapon_threshold: float = 0.75,
                  violence_threshold: float = 0.60,
@@ -45,12 +206,48 @@ class DetectionFusionEngine:
         self.fusion_mode = fusion_mode
         
         # Detection history for context
-        self.detection_history = []
         self.max_history = 100
         
+        # ⚡ OPTIMIZATION: Struct-of-arrays ring buffer for trend/status aggregates
+        self._det = np.zeros(self.max_history, np.uint8)
+        self._sev = np.zeros(self.max_history, np.float32)
+        self._ts = np.zeros(self.max_history, np.int64)  # time.monotonic_ns()
+        self._head = 0  # Next slot to write
+        self._count = 0  # Valid entries
+        # Monotonic -> wall clock, captured once; timestamps are only formatted on request
+        self._wall_offset_ns = time.time_ns() - time.monotonic_ns()
+        
+        # ⚡ OPTIMIZATION: Precompiled decision tables per fusion mode
+        # Indexed by (weapon_detected << 1) | violence_detected; each entry takes
+        # (weapon_result, violence_result, weapon_confidence, violence_confidence)
+        normal = lambda wr, vr, wc, vc: self._normal_fusion()
+        violence_only = lambda wr, vr, wc, vc: self._violence_only_fusion(vr)
+        weapon_only = lambda wr, vr, wc, vc: self._weapon_only_fusion(wr)
+        critical = lambda wr, vr, wc, vc: self._critical_threat_fusion(True, True, wr, vr)
+        
+        adaptive_table = (normal, violence_only, weapon_only, critical)
+        aggressive_table = (
+            lambda wr, vr, wc, vc: self._suspicious_activity_fusion(vr) if vc > 0.50 else self._normal_fusion(),
+            violence_only,
+            weapon_only,
+            weapon_only  # Weapon takes precedence
+        )
+        conservative_table = (
+            normal,
+            lambda wr, vr, wc, vc: self._violence_only_fusion(vr) if vc > 0.80 else self._normal_fusion(),
+            lambda wr, vr, wc, vc: self._weapon_only_fusion(wr) if wc > 0.90 else self._normal_fusion(),
+            self._conservative_both
+        )
+        
+        # ⚡ OPTIMIZATION: fusion_mode is fixed - select its table once instead of per frame
+        self._fuse = {
+            "conservative": conservative_table,
+            "aggressive": aggressive_table
+        }.get(fusion_mode, adaptive_table)  # adaptive (default)
+        
     def fuse_detections(self, 
                        weapon_result: Dict,
-                       violence_result: Dict) -> Dict:
+                       violence_result: Dict) -> FusedResult:
         """
         Fuse results from both detection streams
         
@@ -59,304 +256,164 @@ class DetectionFusionEngine:
             violence_result: Output from violence detection (CNN-LSTM)
         
         Returns:
-            Fused detection result with severity and recommendation
+            FusedResult with severity and recommendation (use to_dict() to serialize)
         """
         
-        # Extract detection flags
-        weapon_detected = weapon_result.get("detected", False) and \
-                         weapon_result.get("confidence", 0) >= self.weapon_threshold
-        
-        violence_detected = violence_result.get("detected", False) and \
-                           violence_result.get("confidence", 0) >= self.violence_threshold
-        
         # Get confidence scores
         weapon_confidence = weapon_result.get("confidence", 0.0)
         violence_confidence = violence_result.get("confidence", 0.0)
         
-        # Apply fusion logic
-        fused_result = self._apply_fusion_logic(
-            weapon_detected=weapon_detected,
-            violence_detected=violence_detected,
-            weapon_confidence=weapon_confidence,
-            violence_confidence=violence_confidence,
-            weapon_result=weapon_result,
-            violence_result=violence_result
+        # Extract detection flags into a single table index
+        index = (
+            (bool(weapon_result.get("detected", False) and weapon_confidence >= self.weapon_threshold) << 1)
+            | bool(violence_result.get("detected", False) and violence_confidence >= self.violence_threshold)
         )
         
+        # Apply fusion logic
+        fused_result = self._fuse[index](weapon_result, violence_result, weapon_confidence, violence_confidence)
+        
         # Store in history
         self._add_to_history(fused_result)
         
         return fused_result
     
-    def _apply_fusion_logic(self,
-                           weapon_detected: bool,
-                           violence_detected: bool,
-                           weapon_confidence: float,
-                           violence_confidence: float,
-                           weapon_result: Dict,
-                           violence_result: Dict) -> Dict:
-        """
-        Apply fusion logic based on fusion mode
-        """
-        
-        if self.fusion_mode == "conservative":
-            return self._conservative_fusion(
-                weapon_detected, violence_detected,
-                weapon_confidence, violence_confidence,
-                weapon_result, violence_result
-            )
-        elif self.fusion_mode == "aggressive":
-            return self._aggressive_fusion(
-                weapon_detected, violence_detected,
-                weapon_confidence, violence_confidence,
-                weapon_result, violence_result
-            )
-        else:  # adaptive (default)
-            return self._adaptive_fusion(
-                weapon_detected, violence_detected,
-                weapon_confidence, violence_confidence,
-                weapon_result, violence_result
-            )
-    
     def _critical_threat_fusion(self, 
                                weapon_detected: bool,
                                violence_detected: bool,
                                weapon_result: Dict,
-                               violence_result: Dict) -> Dict:
+                               violence_result: Dict) -> FusedResult:
         """
         Both weapon AND violence detected
         Highest alert level - Immediate response required
         """
-        return {
-            "detected": True,
-            "type": "critical_threat",
-            "severity": AlertSeverity.CRITICAL,
-            "severity_score": 1.0,
-            "description": f"🚨 CRITICAL: Weapon + Aggressive behavior detected!\n"
-                          f"   Weapon: {weapon_result.get('description', 'Unknown')}\n"
-                          f"   Behavior: {violence_result.get('description', 'Aggressive')}",
-            "weapon_detection": weapon_result,
-            "violence_detection": violence_result,
-            "confidence": (weapon_result.get("confidence", 0) + 
-                          violence_result.get("confidence", 0)) / 2,
-            "action": "IMMEDIATE_ALERT",
-            "recommended_response": [
-                "Sound alarm immediately",
-                "Alert security personnel",
-                "Notify law enforcement",
-                "Record all footage"
-            ]
-        }
+        return FusedResult(
+            **_CRITICAL_BASE,
+            description=_LazyDescription(_CRITICAL_FMT, (
+                weapon_result.get('description', 'Unknown'),
+                violence_result.get('description', 'Aggressive')
+            )),
+            weapon_detection=weapon_result,
+            violence_detection=violence_result,
+            confidence=self._fuse_confidence(
+                weapon_result.get("confidence", 0),
+                violence_result.get("confidence", 0)
+            )
+        )
+    
+    @staticmethod
+    def _fuse_confidence(weapon_confidence: float, violence_confidence: float) -> float:
+        """
+        Confidence-weighted fusion of the two stream scores
+        Each stream is weighted by its inverse uncertainty (1 / -log c), so the
+        more certain detector dominates instead of a plain average
+        """
+        eps = 1e-6
+        w = 1.0 / (-math.log(max(weapon_confidence, eps)) + eps)
+        v = 1.0 / (-math.log(max(violence_confidence, eps)) + eps)
+        return (w * weapon_confidence + v * violence_confidence) / (w + v)
     
     def _weapon_only_fusion(self,
-                           weapon_result: Dict) -> Dict:
+                           weapon_result: Dict) -> FusedResult:
         """
         Only weapon detected, no violence pattern
         High alert - Potential threat
         """
-        weapon_type = weapon_result.get("description", "Unknown weapon")
         confidence = weapon_result.get("confidence", 0)
         
-        return {
-            "detected": True,
-            "type": "weapon_detected",
-            "severity": AlertSeverity.HIGH,
-            "severity_score": 0.9,
-            "description": f"⚠️ HIGH: Weapon detected\n"
-                          f"   {weapon_type}\n"
-                          f"   Confidence: {confidence:.1%}",
-            "weapon_detection": weapon_result,
-            "violence_detection": {"detected": False},
-            "confidence": confidence,
-            "action": "IMMEDIATE_ALERT",
-            "recommended_response": [
-                "Alert security immediately",
-                "Track person with weapon",
-                "Record all angles",
-                "Prepare emergency response"
-            ]
-        }
+        return FusedResult(
+            **_WEAPON_BASE,
+            description=_LazyDescription(_WEAPON_FMT, (weapon_result.get("description", "Unknown weapon"), confidence)),
+            weapon_detection=weapon_result,
+            confidence=confidence
+        )
     
     def _violence_only_fusion(self,
-                             violence_result: Dict) -> Dict:
+                             violence_result: Dict) -> FusedResult:
         """
         Only violence detected, no weapon
         Medium alert - Requires investigation
         """
         violence_confidence = violence_result.get("confidence", 0)
         
-        return {
-            "detected": True,
-            "type": "violence_detected",
-            "severity": AlertSeverity.MEDIUM,
-            "severity_score": 0.7,
-            "description": f"⚠️ MEDIUM: Aggressive behavior detected\n"
-                          f"   {violence_result.get('description', 'Violent activity')}\n"
-                          f"   Confidence: {violence_confidence:.1%}",
-            "weapon_detection": {"detected": False},
-            "violence_detection": violence_result,
-            "confidence": violence_confidence,
-            "action": "ALERT_AND_MONITOR",
-            "recommended_response": [
-                "Alert security to monitor",
-                "Zoom in for details",
-                "Prepare to intervene if needed",
-                "Record incident"
-            ]
-        }
+        return FusedResult(
+            **_VIOLENCE_BASE,
+            description=_LazyDescription(_VIOLENCE_FMT, (violence_result.get('description', 'Violent activity'), violence_confidence)),
+            violence_detection=violence_result,
+            confidence=violence_confidence
+        )
     
     def _suspicious_activity_fusion(self,
-                                   violence_result: Dict) -> Dict:
+                                   violence_result: Dict) -> FusedResult:
         """
         Low confidence violence detection - Suspicious but not confirmed
         Low alert - Requires manual verification
         """
         violence_confidence = violence_result.get("confidence", 0)
         
-        return {
-            "detected": True,
-            "type": "suspicious_activity",
-            "severity": AlertSeverity.LOW,
-            "severity_score": 0.4,
-            "description": f"⚠️ LOW: Suspicious activity detected\n"
-                          f"   {violence_result.get('description', 'Unusual activity')}\n"
-                          f"   Confidence: {violence_confidence:.1%}",
-            "weapon_detection": {"detected": False},
-            "violence_detection": violence_result,
-            "confidence": violence_confidence,
-            "action": "MONITOR",
-            "recommended_response": [
-                "Keep monitoring",
-                "Manual verification recommended",
-                "Check for context clues"
-            ]
-        }
+        return FusedResult(
+            **_SUSPICIOUS_BASE,
+            description=_LazyDescription(_SUSPICIOUS_FMT, (violence_result.get('description', 'Unusual activity'), violence_confidence)),
+            violence_detection=violence_result,
+            confidence=violence_confidence
+        )
     
-    def _normal_fusion(self) -> Dict:
+    def _normal_fusion(self) -> FusedResult:
         """
         No threats detected - Normal activity
         No alert
         """
-        return {
-            "detected": False,
-            "type": "normal",
-            "severity": AlertSeverity.NONE,
-            "severity_score": 0.0,
-            "description": "✅ Normal activity - No threats detected",
-            "weapon_detection": {"detected": False},
-            "violence_detection": {"detected": False},
-            "confidence": 0.0,
-            "action": "NONE",
-            "recommended_response": []
-        }
-    
-    def _adaptive_fusion(self,
-                        weapon_detected: bool,
-                        violence_detected: bool,
-                        weapon_confidence: float,
-                        violence_confidence: float,
-                        weapon_result: Dict,
-                        violence_result: Dict) -> Dict:
-        """
-        Adaptive fusion: Balance sensitivity and specificity
-        
-        FIX: Removed over-sensitive 0.45 threshold that caused false positives
-        Now only alerts on actual detections above thresholds
-        """
-        # Scenario 1: Both detected - CRITICAL
-        if weapon_detected and violence_detected:
-            return self._critical_threat_fusion(
-                weapon_detected, violence_detected,
-                weapon_result, violence_result
-            )
-        
-        # Scenario 2: Weapon only - HIGH
-        if weapon_detected:
-            return self._weapon_only_fusion(weapon_result)
-        
-        # Scenario 3: Violence only
-        if violence_detected:
-            return self._violence_only_fusion(violence_result)
-        
-        # Scenario 4: REMOVED - Was triggering false positives at 0.45 confidence
-        # Only alert on confirmed detections above thresholds
-        
-        # Scenario 5: Normal
-        return self._normal_fusion()
+        return _NORMAL_RESULT
     
-    def _conservative_fusion(self,
-                            weapon_detected: bool,
-                            violence_detected: bool,
-                            weapon_confidence: float,
-                            violence_confidence: float,
-                            weapon_result: Dict,
-                            violence_result: Dict) -> Dict:
-        """
-        Conservative fusion: High confidence required for alerts
-        Reduces false positives, may miss some threats
-        """
-        # Only alert if very high confidence
-        if weapon_detected and weapon_confidence > 0.90:
-            return self._weapon_only_fusion(weapon_result)
-        
-        if violence_detected and violence_confidence > 0.80:
-            return self._violence_only_fusion(violence_result)
-        
-        if weapon_detected and violence_detected:
-            return self._critical_threat_fusion(
-                weapon_detected, violence_detected,
-                weapon_result, violence_result
-            )
-        
-        return self._normal_fusion()
-    
-    def _aggressive_fusion(self,
-                          weapon_detected: bool,
-                          violence_detected: bool,
-                          weapon_confidence: float,
-                          violence_confidence: float,
-                          weapon_result: Dict,
-                          violence_result: Dict) -> Dict:
+    def _conservative_both(self,
+                           weapon_result: Dict,
+                           violence_result: Dict,
+                           weapon_confidence: float,
+                           violence_confidence: float) -> FusedResult:
         """
-        Aggressive fusion: Lower threshold, more alerts
-        Higher sensitivity, more false positives
+        Conservative fusion with both streams above threshold
+        Very high single-stream confidence is reported on its own; otherwise CRITICAL
         """
-        # Alert on any detection
-        if weapon_detected:
+        if weapon_confidence > 0.90:
             return self._weapon_only_fusion(weapon_result)
         
-        if violence_detected:
+        if violence_confidence > 0.80:
             return self._violence_only_fusion(violence_result)
         
-        # Even low confidence triggers alert
-        if violence_confidence > 0.50:
-            return self._suspicious_activity_fusion(violence_result)
-        
-        return self._normal_fusion()
+        return self._critical_threat_fusion(True, True, weapon_result, violence_result)
     
-    def _add_to_history(self, detection: Dict):
+    def _add_to_history(self, detection: FusedResult):
         """Add detection to history for trend analysis"""
-        detection_with_timestamp = {
-            **detection,
-            "timestamp": datetime.now().isoformat()
-        }
-        self.detection_history.append(detection_with_timestamp)
-        
-        # Keep history manageable
-        if len(self.detection_history) > self.max_history:
-            self.detection_history.pop(0)
+        timestamp_ns = time.monotonic_ns()
+        
+        head = self._head
+        self._det[head] = detection.detected
+        self._sev[head] = detection.severity_score
+        self._ts[head] = timestamp_ns
+        self._head = (head + 1) % self.max_history
+        self._count = min(self._count + 1, self.max_history)
+    
+    def _recent(self, array: np.ndarray, count: int) -> np.ndarray:
+        """Last `count` ring entries of one history column (oldest first)"""
+        start = self._head - count
+        if start >= 0:
+            return array[start:self._head]
+        return np.concatenate((array[start:], array[:self._head]))
     
     def get_trend_analysis(self, window_size: int = 10) -> Dict:
         """
         Analyze recent detections for trends
         Useful for detecting escalating threats
         """
-        if not self.detection_history:
+        if not self._count:
             return {"trend": "none", "recent_alerts": 0}
         
-        recent_detections = self.detection_history[-window_size:]
-        alert_count = sum(1 for d in recent_detections if d["detected"])
-        average_severity = sum(d["severity_score"] for d in recent_detections) / len(recent_detections)
+        if NUMBA_AVAILABLE:
+            alert_count, average_severity = _trend_kernel(self._det, self._sev, self._head, self._count, window_size)
+            alert_count = int(alert_count)
+        else:
+            count = min(window_size, self._count)
+            alert_count = int(self._recent(self._det, count).sum())
+            average_severity = float(self._recent(self._sev, count).mean())
         
         trend = "escalating" if alert_count > window_size * 0.5 else "normal"
         
@@ -367,22 +424,26 @@ class DetectionFusionEngine:
             "detection_rate": f"{(alert_count/window_size)*100:.1f}%"
         }
     
+    def _wall_clock_iso(self, monotonic_ns: int) -> str:
+        """Format a monotonic history timestamp as a local ISO wall-clock time"""
+        return datetime.fromtimestamp((monotonic_ns + self._wall_offset_ns) / 1e9).isoformat()
+    
     def get_system_status(self) -> Dict:
         """Get overall system status"""
-        if not self.detection_history:
+        if not self._count:
             return {
                 "status": "operational",
                 "total_alerts": 0,
                 "last_alert": None
             }
         
-        recent_alerts = [d for d in self.detection_history if d["detected"]]
+        last_timestamp_ns = int(self._ts[self._head - 1])
         
         return {
             "status": "operational",
-            "total_alerts": len(recent_alerts),
-            "last_alert": self.detection_history[-1].get("timestamp"),
-            "alerts_last_10": len([d for d in self.detection_history[-10:] if d["detected"]])
+            "total_alerts": int(self._det.sum()),  # Unused slots are zero
+            "last_alert": self._wall_clock_iso(last_timestamp_ns),
+            "alerts_last_10": int(self._recent(self._det, min(10, self._count)).sum())
         }
 
 
@@ -0,0 +1,82 @@
+"""
+Shared Result Cache
+Fixed-size, shared-memory table of recent /analyze-frame results keyed by
+frame hash, so duplicate uploads that land on different uvicorn workers
+skip decode and inference instead of each worker repeating them
+"""
+
+import struct
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import orjson
+
+_SEQ = struct.Struct("<Q")  # Per-slot sequence counter (seqlock)
+_HEADER = struct.Struct("<QQdI")  # sequence, frame hash, result time, payload length
+
+
+class SharedResultCache:
+    """
+    Direct-mapped cache in a named shared-memory segment
+    Each slot is guarded by a seqlock: writers make the sequence odd, write,
+    then make it even again; readers retry-as-miss if it was odd or changed
+    """
+
+    def __init__(self, name: str, slots: int = 64, slot_bytes: int = 4096, create: bool = False):
+        """
+        Create (launcher) or attach to (worker) the shared segment
+
+        Args:
+            name: Segment name shared by all workers of one server
+            slots: Number of cache slots
+            slot_bytes: Bytes per slot, including the header
+            create: Create the segment; the creator unlinks it once the workers are gone
+        """
+        self.name = name
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self._shm = shared_memory.SharedMemory(name=name, create=create, size=slots * slot_bytes if create else 0)
+        self._buf = self._shm.buf
+
+    def get(self, frame_hash: int, now: float, max_age: float) -> Optional[Tuple[float, dict]]:
+        """Return (result_time, result) if a fresh entry for frame_hash exists"""
+        offset = (frame_hash % self.slots) * self.slot_bytes
+        seq = _SEQ.unpack_from(self._buf, offset)[0]
+        if seq & 1:
+            return None  # Mid-write
+        _, stored_hash, result_time, length = _HEADER.unpack_from(self._buf, offset)
+        if (stored_hash != frame_hash or now - result_time >= max_age
+                or length > self.slot_bytes - _HEADER.size):
+            return None
+        start = offset + _HEADER.size
+        payload = bytes(self._buf[start:start + length])
+        if _SEQ.unpack_from(self._buf, offset)[0] != seq:
+            return None  # Overwritten while reading
+        try:
+            return result_time, orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            return None
+
+    def put(self, frame_hash: int, now: float, result: dict):
+        """Store a result; results too large for a slot are skipped"""
+        payload = orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY)
+        if len(payload) > self.slot_bytes - _HEADER.size:
+            return
+        offset = (frame_hash % self.slots) * self.slot_bytes
+        seq = _SEQ.unpack_from(self._buf, offset)[0]
+        if seq & 1:
+            return  # Another worker is writing this slot
+        start = offset + _HEADER.size
+        _SEQ.pack_into(self._buf, offset, seq + 1)  # Odd: readers see a miss until the write completes
+        _HEADER.pack_into(self._buf, offset, seq + 1, frame_hash, now, len(payload))
+        self._buf[start:start + len(payload)] = payload
+        _SEQ.pack_into(self._buf, offset, seq + 2)
+
+    def close(self):
+        """Detach from the segment"""
+        self._buf.release()
+        self._shm.close()
+
+    def unlink(self):
+        """Destroy the segment (creator only, after every worker has exited)"""
+        self._shm.unlink()
@@ -1,10 +1,31 @@
 import cv2
 import asyncio
-from .detection_engine import detection_engine
+import queue
+import time
+import numpy as np
+from .detection_engine import detection_engine, run_blocking
 from .database import log_incident
+from .model_fusion import AlertSeverity
+from .jpeg_codec import save_jpeg
+from .log_config import get_logger, RateLimitedLogger
 import os
 from typing import Callable, Dict
 
+logger = get_logger(__name__)
+# ⚡ OPTIMIZATION: Per-alert messages are capped so an alert storm can't serialize the loop on logging
+alert_log = RateLimitedLogger(logger, hz=5)
+evidence_log = RateLimitedLogger(logger, hz=5)
+
+ALERTS_DIR = "alerts"
+# Severity (enum or its plain value) -> client string; str(AlertSeverity.HIGH) would give "AlertSeverity.HIGH"
+_SEV_STR = {**{s: s.value for s in AlertSeverity}, **{s.value: s.value for s in AlertSeverity}}
+
+STATIC_SCENE_REUSE_SECONDS = 2.0  # Max age of a result reused for an unchanged scene
+ALERT_BATCH_SIZE = 16  # Max alerts coalesced into one callback/WebSocket message
+FRAME_QUEUE_SIZE = 2  # Frames buffered between reader thread and detector; oldest dropped when full
+JPEG_QUALITY = 80  # Evidence quality; ~2-3x smaller files than the imwrite default of 95
+
+
 class VideoProcessor:
     """
     Hybrid Video Processor
@@ -32,90 +53,181 @@ class VideoProcessor:
         # ⚡ OPTIMIZATION: Cache for frame processing
         self.last_detection_result = None
         self.last_detection_time = 0
+        self._last_hash = None
+        
+        self._frame_queue = None
+        self._alert_queue = None
+        self._free_buffers = None  # Reusable frame buffers shared by reader thread and loop
         
     async def start(self, alert_callback: Callable):
         """
         Start video processing
         
         Args:
-            alert_callback: Async callback function for alerts
+            alert_callback: Async callback function for alerts; receives one alert dict,
+                            or a list of alert dicts when several are pending
         """
         self.cap = cv2.VideoCapture(self.source)
         self.is_running = True
+        os.makedirs(ALERTS_DIR, exist_ok=True)
+        
+        # ⚡ OPTIMIZATION: Python owns parallelism; OpenCV's pool would fight the detection threads
+        cv2.setNumThreads(1)
+        
+        # ⚡ OPTIMIZATION: Decode into a fixed set of preallocated buffers instead of a new array per frame
+        # (queued frames + one being analyzed + one being read)
+        height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self._free_buffers = queue.SimpleQueue()
+        for _ in range(FRAME_QUEUE_SIZE + 2):
+            # Unknown size: cap.read allocates on first use, then the array is recycled
+            self._free_buffers.put(np.empty((height, width, 3), np.uint8) if height and width else None)
         
-        print(f"📹 [Video Processor] Starting video capture from source: {self.source}")
-        print(f"🔄 [Video Processor] Frame processing frequency: 1 per {self.process_frequency} frames")
+        # ⚡ OPTIMIZATION: Blocking cap.read() runs on a reader thread feeding a bounded queue
+        loop = asyncio.get_running_loop()
+        self._frame_queue = asyncio.Queue(maxsize=FRAME_QUEUE_SIZE)
+        reader = loop.run_in_executor(None, self._reader_thread, loop)
+        
+        # ⚡ OPTIMIZATION: Alerts are queued and flushed in batches by a sender task
+        self._alert_queue = asyncio.Queue()
+        sender = asyncio.create_task(self._alert_sender(alert_callback))
+        
+        logger.info("📹 [Video Processor] Starting video capture from source: %s", self.source)
+        logger.info("🔄 [Video Processor] Frame processing frequency: 1 per %d frames", self.process_frequency)
         
         while self.is_running:
-            ret, frame = self.cap.read()
-            if not ret:
-                print("⚠️ [Video Processor] End of video stream or error reading frame")
+            frame = await self._frame_queue.get()
+            if frame is None:
+                logger.warning("⚠️ [Video Processor] End of video stream or error reading frame")
                 break
             
             self.frame_counter += 1
             
             # Process every N-th frame (balance between detection and performance)
             # This allows CNN-LSTM to accumulate frames while processing periodically
-            if self.frame_counter % self.process_frequency == 0:
-                result = await detection_engine.analyze_frame(frame)
-                
-                # Log and alert on detection
-                if result.get("detected"):
-                    self.alert_counter += 1
-                    print(f"🚨 [Alert #{self.alert_counter}] {result.get('type').upper()}: {result.get('description')}")
-                    
-                    # Save frame for evidence
-                    await self._save_alert_evidence(frame, result)
-                    
-                    # Log to database
-                    await self._log_incident(result)
-                    
-                    # Notify via callback (WebSocket)
-                    await alert_callback(self._format_alert_for_client(result))
+            try:
+                if self.frame_counter % self.process_frequency == 0:
+                    await self._process_frame(frame)
+            finally:
+                self._free_buffers.put(frame)
         
+        self.is_running = False
+        await reader
+        await self._alert_queue.join()  # Flush pending alerts
+        sender.cancel()
         self.cap.release()
-        print("📹 [Video Processor] Video processing stopped")
+        logger.info("📹 [Video Processor] Video processing stopped")
+    
+    async def _process_frame(self, frame):
+        """Analyze one sampled frame and raise alerts"""
+        # ⚡ OPTIMIZATION: Skip inference while an idle scene is unchanged
+        # Only truly idle results qualify: a threat still being confirmed over consecutive
+        # frames ("validating", or masked as normal by fusion) must keep being analyzed
+        camera_id = str(self.source)
+        frame_hash = self._frame_hash(frame)
+        now = time.time()
+        if (frame_hash == self._last_hash
+                and self.last_detection_result is not None
+                and self.last_detection_result.get("type") == "normal"
+                and not detection_engine.consecutive_weapon_detections.get(camera_id)
+                and now - self.last_detection_time < STATIC_SCENE_REUSE_SECONDS):
+            return
+        self._last_hash = frame_hash
+        
+        result = await detection_engine.analyze_frame(frame, camera_id=camera_id)
+        self.last_detection_result = result
+        self.last_detection_time = now
+        
+        # Log and alert on detection
+        if result.get("detected"):
+            self.alert_counter += 1
+            alert_log.info("🚨 [Alert #%d] %s: %s", self.alert_counter, result.get("type", "").upper(), result.get("description"))
+            
+            # Save frame for evidence
+            await self._save_alert_evidence(frame, result)
+            
+            # Log to database (non-blocking: queued and batch-written by the database module)
+            try:
+                await log_incident(
+                    result.get("type", "unknown"),
+                    result.get("confidence", 0.0),
+                    result.get("description", "Unknown incident"),
+                    result.get("image_path", "")
+                )
+            except Exception as e:
+                logger.error("❌ Failed to log incident: %s", e)
+            
+            # Notify via callback (WebSocket)
+            self._alert_queue.put_nowait(self._format_alert_for_client(result))
+    
+    async def _alert_sender(self, alert_callback: Callable):
+        """Drain queued alerts, sending up to ALERT_BATCH_SIZE per callback"""
+        while True:
+            batch = [await self._alert_queue.get()]
+            while len(batch) < ALERT_BATCH_SIZE and not self._alert_queue.empty():
+                batch.append(self._alert_queue.get_nowait())
+            try:
+                await alert_callback(batch[0] if len(batch) == 1 else batch)
+            except Exception as e:
+                logger.error("❌ Failed to send alerts: %s", e)
+            finally:
+                for _ in batch:
+                    self._alert_queue.task_done()
+    
+    @staticmethod
+    def _frame_hash(frame) -> bytes:
+        """Average hash: 8x8 grayscale thumbnail thresholded at its mean"""
+        small = cv2.resize(frame, (8, 8), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return (gray > gray.mean()).tobytes()
+    
+    def _reader_thread(self, loop):
+        """Read frames into recycled buffers until stopped; None marks end of stream"""
+        while self.is_running:
+            try:
+                buffer = self._free_buffers.get(timeout=0.5)
+            except queue.Empty:
+                continue  # All buffers in use - re-check is_running
+            # Returns `buffer` itself when the shape matches, otherwise a new array that joins the pool
+            ret, frame = self.cap.read(buffer)
+            if not ret:
+                break
+            loop.call_soon_threadsafe(self._enqueue_frame, frame)
+        loop.call_soon_threadsafe(self._enqueue_frame, None)
+    
+    def _enqueue_frame(self, frame):
+        """Queue a frame on the event loop, dropping the oldest one when full (real-time backpressure)"""
+        if self._frame_queue.full():
+            dropped = self._frame_queue.get_nowait()
+            if dropped is not None:
+                self._free_buffers.put(dropped)
+        self._frame_queue.put_nowait(frame)
     
     async def _save_alert_evidence(self, frame, result: Dict):
         """Save frame evidence for alert"""
         try:
             timestamp = int(cv2.getTickCount() / cv2.getTickFrequency() * 1000)
             img_name = f"alert_{result['type']}_{timestamp}.jpg"
-            img_path = os.path.join("alerts", img_name)
-            
-            if not os.path.exists("alerts"):
-                os.makedirs("alerts")
+            img_path = os.path.join(ALERTS_DIR, img_name)
             
-            cv2.imwrite(img_path, frame)
-            print(f"💾 Evidence saved: {img_path}")
+            # ⚡ OPTIMIZATION: Encode (libjpeg-turbo SIMD when available) and write in one hop off the event loop
+            await run_blocking(save_jpeg, img_path, frame, JPEG_QUALITY)
+            evidence_log.info("💾 Evidence saved: %s", img_path)
             result["image_path"] = img_path
             
         except Exception as e:
-            print(f"❌ Failed to save evidence: {e}")
-    
-    async def _log_incident(self, result: Dict):
-        """Log incident to database"""
-        try:
-            await log_incident(
-                incident_type=result.get("type", "unknown"),
-                severity=result.get("severity", "medium"),
-                confidence=result.get("confidence", 0.0),
-                description=result.get("description", "Unknown incident"),
-                image_path=result.get("image_path", ""),
-                additional_data=result
-            )
-        except Exception as e:
-            print(f"❌ Failed to log incident: {e}")
+            logger.error("❌ Failed to save evidence: %s", e)
     
     def _format_alert_for_client(self, result: Dict) -> Dict:
         """Format alert result for WebSocket client"""
+        image_path = result.get("image_path", "")
         return {
             "type": result.get("type"),
-            "severity": str(result.get("severity", "medium")),
+            "severity": _SEV_STR.get(result.get("severity"), "medium"),
             "confidence": result.get("confidence", 0.0),
             "description": result.get("description", ""),
             "timestamp": self.frame_counter,
-            "image_url": f"/alerts/{os.path.basename(result.get('image_path', ''))}",
+            "image_url": f"/alerts/{os.path.basename(image_path)}",
             "weapon_detected": result.get("weapon_detection", {}).get("detected", False),
             "violence_detected": result.get("violence_detection", {}).get("detected", False),
             "recommended_action": result.get("action", "MONITOR"),
@@ -124,10 +236,9 @@ class VideoProcessor:
     
     def stop(self):
         """Stop video processing"""
-        print(f"⏹️  [Video Processor] Stopping... Processed {self.frame_counter} frames, {self.alert_counter} alerts")
+        logger.info("⏹️  [Video Processor] Stopping... Processed %d frames, %d alerts", self.frame_counter, self.alert_counter)
+        # The capture is released by start() once the reader thread has exited
         self.is_running = False
-        if self.cap:
-            self.cap.release()
     
     def get_stats(self) -> Dict:
         """Get processor statistics"""
@@ -6,74 +6,67 @@ Runs in parallel with weapon detection for comprehensive surveillance
 
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
+import torchvision
 import numpy as np
-from collections import deque
-from typing import Dict, Tuple, List
+from contextlib import nullcontext
+from typing import Dict, Tuple, List, Optional
 import cv2
 from PIL import Image
 
+from .log_config import get_logger
+
+logger = get_logger(__name__)
+
 
 class ViolenceLSTMModel(nn.Module):
     """
-    CNN-LSTM architecture for violence detection
+    CNN + temporal-convolution architecture for violence detection
     - CNN: Extracts spatial features from frames
-    - LSTM: Analyzes temporal patterns across frame sequences
+    - Temporal block: Analyzes temporal patterns across frame sequences
     """
     
-    def __init__(self, lstm_hidden_size=256, num_layers=2, device='cpu'):
+    def __init__(self, hidden_size=256, device='cpu'):
         super(ViolenceLSTMModel, self).__init__()
         self.device = device
-        self.lstm_hidden_size = lstm_hidden_size
+        self.hidden_size = hidden_size
         
-        # CNN Feature Extractor (using ResNet-18 backbone)
-        # Extracts 512-dimensional features from each frame
+        # CNN Feature Extractor (ImageNet-pretrained MobileNetV3-Small backbone)
+        # Extracts 576-dimensional features from each [0, 1] RGB frame
+        try:
+            backbone = torchvision.models.mobilenet_v3_small(weights='DEFAULT').features
+        except Exception as e:
+            # Offline and no cached weights - same architecture, random init
+            logger.warning("⚠️ MobileNetV3 weights unavailable, using random init: %s", e)
+            backbone = torchvision.models.mobilenet_v3_small(weights=None).features
         self.cnn = nn.Sequential(
-            # Block 1: Conv -> BatchNorm -> ReLU -> MaxPool
-            nn.Conv2d(3, 64, kernel_size=7, stride=2, padding=3),
-            nn.BatchNorm2d(64),
-            nn.ReLU(inplace=True),
-            nn.MaxPool2d(kernel_size=3, stride=2, padding=1),
-            
-            # Block 2: Conv -> BatchNorm -> ReLU -> MaxPool
-            nn.Conv2d(64, 128, kernel_size=3, stride=1, padding=1),
-            nn.BatchNorm2d(128),
-            nn.ReLU(inplace=True),
-            nn.MaxPool2d(kernel_size=3, stride=2, padding=1),
-            
-            # Block 3: Conv -> BatchNorm -> ReLU
-            nn.Conv2d(128, 256, kernel_size=3, stride=1, padding=1),
-            nn.BatchNorm2d(256),
-            nn.ReLU(inplace=True),
+            torchvision.transforms.Normalize(mean=(0.485, 0.456, 0.406), std=(0.229, 0.224, 0.225)),
+            backbone,
             
             # Global Average Pooling
             nn.AdaptiveAvgPool2d((1, 1))
         )
         
-        # Feature dimension after CNN (for 224x224 input)
-        self.cnn_feature_dim = 256
-        
-        # LSTM Temporal Processor
-        # Bidirectional LSTM for better context understanding
-        self.lstm = nn.LSTM(
-            input_size=self.cnn_feature_dim,
-            hidden_size=lstm_hidden_size,
-            num_layers=num_layers,
-            batch_first=True,
-            bidirectional=True,
-            dropout=0.3 if num_layers > 1 else 0
-        )
+        # Feature dimension after CNN
+        self.cnn_feature_dim = 576
         
-        # Attention mechanism (optional but improves performance)
-        self.attention = nn.Sequential(
-            nn.Linear(lstm_hidden_size * 2, 64),
-            nn.ReLU(),
-            nn.Linear(64, 1),
-            nn.Softmax(dim=1)
+        # Temporal Processor: dilated 1D convolutions over the frame axis (receptive field 15 frames)
+        # ⚡ OPTIMIZATION: Replaces a 2-layer BiLSTM - no step-by-step recurrence, parallel over time
+        self.temporal = nn.Sequential(
+            nn.Conv1d(self.cnn_feature_dim, hidden_size, kernel_size=3, padding=1),
+            nn.GELU(),
+            nn.Conv1d(hidden_size, hidden_size, kernel_size=3, padding=2, dilation=2),
+            nn.GELU(),
+            nn.Conv1d(hidden_size, hidden_size * 2, kernel_size=3, padding=4, dilation=4)
         )
         
+        # Attention pooling over time with a learned query
+        # ⚡ OPTIMIZATION: Runs as one fused scaled_dot_product_attention kernel
+        self.attn_q = nn.Parameter(torch.randn(1, 1, hidden_size * 2) * 0.02)
+        
         # Classification Head
         self.classifier = nn.Sequential(
-            nn.Linear(lstm_hidden_size * 2, 128),
+            nn.Linear(hidden_size * 2, 128),
             nn.ReLU(),
             nn.Dropout(0.5),
             nn.Linear(128, 64),
@@ -82,7 +75,8 @@ class ViolenceLSTMModel(nn.Module):
             nn.Linear(64, 2)  # Binary classification: Violence/No-Violence
         )
         
-    def forward(self, frame_sequence: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+    def forward(self, frame_sequence: torch.Tensor,
+                return_attention: bool = False) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
         """
         Forward pass through the model
         
@@ -90,26 +84,62 @@ class ViolenceLSTMModel(nn.Module):
             frame_sequence: Tensor of shape (batch_size, seq_len, 3, 224, 224)
                           - batch_size: typically 1 for real-time
                           - seq_len: number of frames (typically 16-32)
+            return_attention: Also compute per-frame attention weights (unfused path)
         
         Returns:
             logits: Classification logits (batch_size, 2)
-            attention_weights: Attention weights for interpretability
+            attention_weights: (batch_size, seq_len, 1) weights for interpretability,
+                               or None unless return_attention is set
         """
         batch_size, seq_len, channels, height, width = frame_sequence.shape
         
         # Extract CNN features for each frame
         # Reshape to (batch_size * seq_len, 3, 224, 224)
         frames_reshaped = frame_sequence.view(batch_size * seq_len, channels, height, width)
-        features = self.cnn(frames_reshaped)
+        features = self.extract_features(frames_reshaped)
         # Reshape back to (batch_size, seq_len, feature_dim)
         features = features.view(batch_size, seq_len, -1)
         
-        # LSTM temporal processing
-        lstm_output, (h_n, c_n) = self.lstm(features)
+        return self.classify_features(features, return_attention)
+    
+    def extract_features(self, frames: torch.Tensor) -> torch.Tensor:
+        """
+        Per-frame CNN features
+        
+        Args:
+            frames: Tensor of shape (num_frames, 3, 224, 224)
         
-        # Apply attention to LSTM outputs
-        attention_weights = self.attention(lstm_output)
-        attended_features = (lstm_output * attention_weights).sum(dim=1)
+        Returns:
+            Features of shape (num_frames, cnn_feature_dim)
+        """
+        return self.cnn(frames).flatten(1)
+    
+    def classify_features(self, features: torch.Tensor,
+                          return_attention: bool = False) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+        """
+        Temporal block, attention pooling and classifier over per-frame features
+        
+        Args:
+            features: Tensor of shape (batch_size, seq_len, cnn_feature_dim)
+            return_attention: Also compute per-frame attention weights (unfused path)
+        
+        Returns:
+            Same as forward()
+        """
+        batch_size = features.shape[0]
+        
+        # Temporal processing: (batch, seq_len, feature_dim) -> (batch, seq_len, 2 * hidden_size)
+        temporal_output = self.temporal(features.transpose(1, 2)).transpose(1, 2)
+        
+        # Apply attention to temporal outputs
+        query = self.attn_q.expand(batch_size, -1, -1)
+        attention_weights = None
+        if return_attention:
+            scores = query @ temporal_output.transpose(1, 2) / temporal_output.shape[-1] ** 0.5
+            attention_weights = scores.softmax(dim=-1).transpose(1, 2)
+            attended_features = (temporal_output * attention_weights).sum(dim=1)
+        else:
+            attended_features = F.scaled_dot_product_attention(query, temporal_output, temporal_output).squeeze(1)
         
         # Classification
         logits = self.classifier(attended_features)
@@ -127,7 +157,8 @@ class ViolenceLSTMDetector:
                  sequence_length: int = 16,
                  frame_skip: int = 2,
                  confidence_threshold: float = 0.6,
-                 device: str = 'cuda' if torch.cuda.is_available() else 'cpu'):
+                 device: str = 'cuda' if torch.cuda.is_available() else 'cpu',
+                 checkpoint_path: Optional[str] = None):
         """
         Initialize violence detector
         
@@ -136,59 +167,199 @@ class ViolenceLSTMDetector:
             frame_skip: Process every N-th frame (reduces computation)
             confidence_threshold: Confidence threshold for violence alert
             device: 'cuda' for GPU or 'cpu'
+            checkpoint_path: Trained state_dict to load; without one the model is never
+                             built and inference stays disabled (see _infer)
         """
         self.device = device
         self.sequence_length = sequence_length
         self.frame_skip = frame_skip
         self.confidence_threshold = confidence_threshold
         
-        # Frame buffer for storing recent frames
-        self.frame_buffer = deque(maxlen=sequence_length)
+        # Frame buffer for storing recent frames (224x224 uint8 BGR; converted on the model device per frame)
+        # ⚡ OPTIMIZATION: One preallocated ring, pinned for async upload; frames are resized straight into it
+        self.frame_ring = torch.empty((sequence_length, 224, 224, 3), dtype=torch.uint8,
+                                      pin_memory=(device == 'cuda' and checkpoint_path is not None))
+        self._ring_view = self.frame_ring.numpy()  # Shares memory with frame_ring
+        self.ring_head = 0  # Next slot to write (also the oldest frame once full)
+        self.ring_filled = 0
         self.frame_counter = 0
         
+        # ⚡ OPTIMIZATION: Inference stays disabled until a trained checkpoint is loaded (see _infer);
+        # untrained deployments never build the model, touch CUDA or allocate GPU memory
+        self.checkpoint_path = checkpoint_path
+        self.model_trained = False
+        self.model = None
+        self.feature_ring = None
+        self.feat_stream = None
+        self._graph = None
+        if checkpoint_path:
+            self._init_model()
+            # Only a loaded checkpoint enables inference; random weights would alert ~50% of the time
+            self.model_trained = True
+        
+        self.last_error = None
+        self.last_violence_score = 0.0
+        
+    def _init_model(self):
+        """Build the model plus its feature cache, compiled kernels and CUDA graph"""
         # Model initialization
         self.model = self._load_or_create_model()
-        self.model.to(device)
+        self.model.to(self.device)
         self.model.eval()
         
-        self.last_error = None
-        self.last_violence_score = 0.0
+        if self.device == 'cuda':
+            # ⚡ OPTIMIZATION: NHWC conv weights let cuDNN use tensor-core kernels without per-conv transposes
+            self.model.cnn.to(memory_format=torch.channels_last)
+            # Input shapes here are fixed, so cuDNN's one-time algorithm search pays off
+            torch.backends.cudnn.benchmark = True
+        
+        # ⚡ OPTIMIZATION: INT8 weights for the Linear layers on CPU
+        # (dynamic quantization doesn't cover convolutions; they stay FP32)
+        if self.device == 'cpu':
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model, {nn.Linear}, dtype=torch.qint8
+            )
+        
+        # ⚡ OPTIMIZATION: Let TorchInductor fuse the CNN and classifier kernels on GPU
+        if self.device == 'cuda' and hasattr(torch, "compile"):
+            self._compile_model()
         
+        # ⚡ OPTIMIZATION: Each frame's CNN features are computed once, as the frame arrives (on GPU on a
+        # side stream, overlapping capture); a window only runs the temporal head over cached features
+        self.feature_ring = torch.zeros(self.sequence_length, self.model.cnn_feature_dim, device=self.device)
+        self.feat_stream = torch.cuda.Stream() if self.device == 'cuda' else None
+        
+        # ⚡ OPTIMIZATION: The window shape is fixed, so replay the temporal head from one CUDA graph
+        if self.device == 'cuda':
+            self._capture_graph()
+    
     def _load_or_create_model(self) -> ViolenceLSTMModel:
         """
-        Load pre-trained model or create new one
-        In production, this would load from checkpoint
+        Create the model and load the trained weights from checkpoint_path
+        Raises if the checkpoint is missing or doesn't match the architecture
         """
         model = ViolenceLSTMModel(
-            lstm_hidden_size=256,
-            num_layers=2,
+            hidden_size=256,
             device=self.device
         )
+        state_dict = torch.load(self.checkpoint_path, map_location='cpu', weights_only=True)
+        model.load_state_dict(state_dict)
+        logger.info("✅ CNN-LSTM weights loaded from %s", self.checkpoint_path)
         return model
     
-    def preprocess_frame(self, frame: np.ndarray) -> np.ndarray:
+    def _compile_model(self):
         """
-        Preprocess frame for CNN input
-        
-        Args:
-            frame: Input frame (BGR from OpenCV)
+        Compile the CNN, temporal block and classifier with torch.compile and warm
+        up once so the kernel cache is built before the first real window
+        """
+        cnn, temporal, classifier = self.model.cnn, self.model.temporal, self.model.classifier
+        try:
+            # Default mode: the whole forward is CUDA-graphed by _capture_graph instead
+            self.model.cnn = torch.compile(cnn, fullgraph=True)
+            self.model.temporal = torch.compile(temporal, fullgraph=True)
+            self.model.classifier = torch.compile(classifier, fullgraph=True)
+            with torch.inference_mode():
+                self.model(torch.zeros(1, self.sequence_length, 3, 224, 224, device=self.device))
+                self.model.extract_features(  # Per-frame shape and layout
+                    torch.zeros(1, 3, 224, 224, device=self.device).contiguous(memory_format=torch.channels_last)
+                )
+            logger.info("✅ CNN-LSTM compiled with torch.compile")
+        except Exception as e:
+            # No Triton/compiler available - keep the eager modules
+            self.model.cnn, self.model.temporal, self.model.classifier = cnn, temporal, classifier
+            logger.warning("⚠️ torch.compile unavailable, using eager CNN-LSTM: %s", e)
+    
+    def _capture_graph(self):
+        """
+        Capture the temporal head for a (1, seq_len, cnn_feature_dim) feature window in a CUDA graph
+        Falls back to eager launches if capture fails
+        """
+        try:
+            static_in = torch.zeros(1, self.sequence_length, self.model.cnn_feature_dim, device=self.device)
+            
+            # Warm up on a side stream so lazy allocations/cuDNN autotuning happen before capture
+            side_stream = torch.cuda.Stream()
+            side_stream.wait_stream(torch.cuda.current_stream())
+            with torch.inference_mode(), torch.cuda.stream(side_stream):
+                for _ in range(3):
+                    self._run_head(static_in)
+            torch.cuda.current_stream().wait_stream(side_stream)
+            
+            graph = torch.cuda.CUDAGraph()
+            with torch.inference_mode(), torch.cuda.graph(graph):
+                static_out = self._run_head(static_in)
+            
+            self._static_in, self._static_out, self._graph = static_in, static_out, graph
+            logger.info("✅ CNN-LSTM temporal head captured in a CUDA graph")
+        except Exception as e:
+            self._graph = None
+            logger.warning("⚠️ CUDA graph capture failed, using eager launches: %s", e)
+    
+    def _autocast(self):
+        """BF16 autocast on GPU; no-op on CPU"""
+        if self.device == 'cuda':
+            # ⚡ OPTIMIZATION: BF16 tensor-core convs/GEMMs; autocast keeps precision-sensitive ops in FP32
+            return torch.autocast('cuda', dtype=torch.bfloat16)
+        return nullcontext()
+    
+    def _run_head(self, features: torch.Tensor) -> torch.Tensor:
+        """Temporal head call (features in) plus softmax; returns (2,) class probabilities"""
+        with self._autocast():
+            logits, _ = self.model.classify_features(features)
+        return logits.float().softmax(dim=-1)[0]
+    
+    def _extract_frame_features(self, slot: int):
+        """
+        Compute CNN features for one ring slot into feature_ring
+        On GPU this is queued on the side stream: the pinned slot is uploaded
+        asynchronously and is not rewritten until sequence_length frames later
+        """
+        stream = torch.cuda.stream(self.feat_stream) if self.feat_stream is not None else nullcontext()
+        with torch.inference_mode(), stream:
+            frame = self.frame_ring[slot].to(self.device, non_blocking=True)
+            # BGR->RGB, HWC->CHW; uint8 -> float cast and /255 in one op (no float temporary)
+            # flip() rather than a [2, 1, 0] index: no index tensor built and copied to the device per frame
+            frame = torch.mul(frame.flip(-1).permute(2, 0, 1), 1.0 / 255.0).unsqueeze(0)
+            # The HWC upload is already NHWC in memory - this only fixes the strides, no copy
+            frame = frame.contiguous(memory_format=torch.channels_last)
+            with self._autocast():
+                features = self.model.extract_features(frame)
+            self.feature_ring[slot].copy_(features[0])
+    
+    def _forward(self) -> torch.Tensor:
+        """
+        Run the temporal head over the cached features of the buffered window
         
         Returns:
-            Preprocessed frame (normalized, resized to 224x224)
+            Class probabilities of shape (2,)
         """
-        # Convert BGR to RGB
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if self.feat_stream is not None:
+            torch.cuda.current_stream().wait_stream(self.feat_stream)
+        order = torch.arange(self.ring_head, self.ring_head + self.sequence_length,
+                             device=self.device) % self.sequence_length  # Oldest frame first
+        if self._graph is not None:
+            torch.index_select(self.feature_ring, 0, order, out=self._static_in[0])
+            self._graph.replay()
+            return self._static_out.clone()  # The next replay overwrites static_out
         
-        # Resize to 224x224
-        frame_resized = cv2.resize(frame_rgb, (224, 224))
-        
-        # Normalize to [0, 1]
-        frame_normalized = frame_resized.astype(np.float32) / 255.0
+        with torch.inference_mode():
+            return self._run_head(self.feature_ring[order].unsqueeze(0))
+    
+    def preprocess_frame(self, frame: np.ndarray, dst: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Preprocess frame for buffering
+        Only the resize runs on the CPU - colour swap, layout and scaling happen
+        on the model device in _extract_frame_features
         
-        # Convert to tensor
-        frame_tensor = torch.from_numpy(frame_normalized).permute(2, 0, 1)
+        Args:
+            frame: Input frame (BGR from OpenCV)
+            dst: Optional (224, 224, 3) uint8 array to resize into
         
-        return frame_tensor
+        Returns:
+            Frame resized to 224x224 (uint8 BGR)
+        """
+        # Resizing before upload keeps the transfer at 224x224, not the full camera frame
+        return cv2.resize(frame, (224, 224), dst=dst)
     
     def add_frame(self, frame: np.ndarray) -> Dict:
         """
@@ -212,17 +383,20 @@ class ViolenceLSTMDetector:
             }
         
         try:
-            # Preprocess and add to buffer
-            processed_frame = self.preprocess_frame(frame)
-            self.frame_buffer.append(processed_frame)
+            # Preprocess into the next ring slot
+            self.preprocess_frame(frame, self._ring_view[self.ring_head])
+            if self.model_trained:
+                self._extract_frame_features(self.ring_head)
+            self.ring_head = (self.ring_head + 1) % self.sequence_length
+            self.ring_filled = min(self.ring_filled + 1, self.sequence_length)
             
             # Perform inference only when buffer is full
-            if len(self.frame_buffer) < self.sequence_length:
+            if self.ring_filled < self.sequence_length:
                 return {
                     "detected": False,
                     "confidence": 0.0,
                     "type": "buffering",
-                    "description": f"Buffering frames: {len(self.frame_buffer)}/{self.sequence_length}"
+                    "description": f"Buffering frames: {self.ring_filled}/{self.sequence_length}"
                 }
             
             # Inference when buffer is full
@@ -245,6 +419,18 @@ class ViolenceLSTMDetector:
         Untrained models produce random outputs causing 50% false positive rate
         """
         try:
+            if self.model_trained:
+                normal_prob, violence_prob = self._forward().tolist()
+                self.last_violence_score = violence_prob
+                is_detected = violence_prob >= self.confidence_threshold
+                return {
+                    "detected": is_detected,
+                    "confidence": round(violence_prob, 3),
+                    "normal_confidence": round(normal_prob, 3),
+                    "type": "violence" if is_detected else "normal_behavior",
+                    "description": self._generate_description(violence_prob, is_detected)
+                }
+            
             # CRITICAL FIX: Untrained models produce random outputs
             # Do NOT use this model until properly trained on datasets:
             # - Hockey Fights Database
@@ -290,13 +476,14 @@ class ViolenceLSTMDetector:
     
     def reset_buffer(self):
         """Reset frame buffer (useful after alert)"""
-        self.frame_buffer.clear()
+        self.ring_head = 0
+        self.ring_filled = 0
         self.frame_counter = 0
     
     def get_buffer_stats(self) -> Dict:
         """Get current buffer statistics"""
         return {
-            "buffer_size": len(self.frame_buffer),
+            "buffer_size": self.ring_filled,
             "max_size": self.sequence_length,
             "frames_processed": self.frame_counter,
             "last_violence_score": self.last_violence_score
@@ -307,7 +494,7 @@ class ViolenceLSTMDetector:
 VIOLENCE_MODELS = {
     "cnn_lstm_v1": {
         "name": "CNN-LSTM Violence Detection v1",
-        "architecture": "ResNet18 + BiLSTM",
+        "architecture": "MobileNetV3-Small + dilated temporal conv",
         "sequence_length": 16,
         "input_size": (224, 224),
         "trained_on": ["Hockey Fights", "RLVS Dataset", "Custom Violence Footage"],
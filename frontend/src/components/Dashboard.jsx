@@ -59,8 +59,11 @@ const Dashboard = () => {
             if (!isMounted) return;
             try {
                 const data = JSON.parse(event.data);
-                const newIncident = { ...data, timestamp: new Date() };
-                setIncidents(prev => [newIncident, ...prev].slice(0, 50));
+                if (data.type === "heartbeat") return;
+                // Batched alerts arrive as an array (oldest first)
+                const alerts = Array.isArray(data) ? data : [data];
+                const newIncidents = alerts.map(alert => ({ ...alert, timestamp: new Date() })).reverse();
+                setIncidents(prev => [...newIncidents, ...prev].slice(0, 50));
             } catch (e) { console.error("WS Parse Error", e); }
         };
 
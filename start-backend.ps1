@@ -9,6 +9,9 @@ Write-Host "🚀 Starting Backend Server..." -ForegroundColor Cyan
 # Activate virtual environment
 & $venvPath
 
+# Precompile backend bytecode so uvicorn workers skip .py -> .pyc on first import
+python -m compileall -q -j 0 backend
+
 # Start the backend server
 Write-Host "📡 Starting FastAPI server on http://localhost:8000" -ForegroundColor Green
 python -m uvicorn backend.main:app --reload --host 0.0.0.0 --port 8000
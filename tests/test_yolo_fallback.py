@@ -0,0 +1,65 @@
+"""
+YOLOv8 fallback gating in DetectionEngine._detect_weapons_batch
+"""
+
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("torch")
+pytest.importorskip("dotenv")
+
+from backend.detection_engine import DetectionEngine
+from backend.hybrid_config import HybridSystemConfig
+
+
+class _FakeYolo:
+    """Stands in for the YOLOv8 model; only class names are read"""
+    names = {0: "pistol"}
+
+
+def _engine(preset="balanced", yolo_score=0.80, detector=True):
+    """DetectionEngine with stubbed models, skipping model loading in __init__"""
+    engine = DetectionEngine.__new__(DetectionEngine)
+    engine.config = HybridSystemConfig(preset)
+    engine.model = _FakeYolo()
+    engine.detector = object() if detector else None
+    # DETR sees nothing; YOLOv8 reports one box at yolo_score
+    engine._run_detr = lambda frames, threshold: [[] for _ in frames]
+    engine._run_yolo = lambda frames, threshold: [([yolo_score], [0.0], [[0.0, 0.0, 100.0, 100.0]]) for _ in frames]
+    return engine
+
+
+def test_yolo_only_hit_below_fallback_threshold_does_not_alert():
+    # 0.80 clears balanced's 0.75 but not the 0.75 * 1.2 needed to overrule DETR
+    engine = _engine()
+    
+    results = engine._detect_weapons_batch([None], [True])
+    
+    assert results[0]["detected"] is False
+
+
+def test_yolo_alerts_at_plain_threshold_without_detr():
+    engine = _engine(detector=False)
+    
+    results = engine._detect_weapons_batch([None], [False])
+    
+    assert results[0]["detected"] is True
+    assert results[0]["model"] == "YOLOv8"
+
+
+@pytest.mark.parametrize("yolo_score", [0.90, 0.95, 0.99])
+def test_prefilter_escalates_idle_camera_in_default_preset(yolo_score):
+    # low_false_positives (the deployed preset) scales 0.85 to 1.0; the pre-filter must still fire
+    engine = _engine("low_false_positives", yolo_score)
+    
+    results = engine._detect_weapons_batch([None], [False])
+    
+    assert results[0]["detected"] is True
+
+
+def test_prefilter_ignores_hit_below_plain_threshold():
+    engine = _engine("low_false_positives", 0.80)
+    
+    results = engine._detect_weapons_batch([None], [False])
+    
+    assert results[0]["detected"] is False
@@ -23,7 +23,7 @@ Write-Host "2. Checking Python Packages..." -ForegroundColor White
 $requiredPackages = @(
     "fastapi",
     "uvicorn",
-    "motor",
+    "mongojet",
     "pymongo",
     "opencv-python",
     "google-generativeai",
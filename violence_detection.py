@@ -9,6 +9,7 @@ Compatible with Google Colab and local environments.
 
 import os
 import sys
+import asyncio
 import cv2
 import time
 import torch
@@ -19,6 +20,14 @@ import matplotlib.pyplot as plt
 from PIL import Image
 from collections import Counter
 
+# Optional: NVDEC video decode straight into GPU memory
+try:
+    import decord
+    decord.bridge.set_bridge('torch')
+    DECORD_AVAILABLE = True
+except ImportError:
+    DECORD_AVAILABLE = False
+
 # ==========================================
 # STEP 1: ENVIRONMENT DETECTION & CONFIG
 # ==========================================
@@ -93,15 +102,121 @@ if not detection_engine:
     YOLO_WEIGHTS_PATH = "/content/weights/best.pt" if IN_COLAB else os.path.join("backend", "weights", "best.pt")
     
     if os.path.exists(YOLO_WEIGHTS_PATH):
-        yolo_model = YOLO(YOLO_WEIGHTS_PATH)
+        yolo_weights = YOLO_WEIGHTS_PATH
     else:
         print(f"Custom weights not found at {YOLO_WEIGHTS_PATH}. Falling back to yolov8n.pt")
-        yolo_model = YOLO("yolov8n.pt")
+        yolo_weights = "yolov8n.pt"
+    yolo_model = YOLO(yolo_weights)
+
+# 2.3 Optional: TensorRT (FP16) engines for the standalone models on CUDA
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+EVAL_BATCH_SIZE = 16  # Sampled video frames per standalone DETR forward
+
+# DETR processor output range: shortest edge 800 / longest edge 1333, padded per batch.
+# TensorRT builds one engine for this profile instead of rebuilding per input shape.
+DETR_MIN_SIDE, DETR_OPT_SHAPE, DETR_MAX_SIDE = 320, (800, 1066), 1333
+
+def _trt_profile(batch, height, width):
+    """TensorRT shape-profile string for the DETR ONNX inputs."""
+    return f"pixel_values:{batch}x3x{height}x{width},pixel_mask:{batch}x{height}x{width}"
+
+class OnnxDetr:
+    """DETR exported to ONNX, run by ONNX Runtime (TensorRT -> CUDA providers) with reused IO binding.
+    Called like DetrForObjectDetection; returns an object with .logits / .pred_boxes for post-processing."""
+
+    def __init__(self, onnx_path, cache_dir):
+        providers = [
+            ("TensorrtExecutionProvider", {
+                "trt_fp16_enable": True,
+                "trt_engine_cache_enable": True,
+                "trt_engine_cache_path": cache_dir,
+                "trt_profile_min_shapes": _trt_profile(1, DETR_MIN_SIDE, DETR_MIN_SIDE),
+                "trt_profile_opt_shapes": _trt_profile(EVAL_BATCH_SIZE, *DETR_OPT_SHAPE),
+                "trt_profile_max_shapes": _trt_profile(EVAL_BATCH_SIZE, DETR_MAX_SIDE, DETR_MAX_SIDE),
+            }),
+            "CUDAExecutionProvider",
+        ]
+        self.session = ort.InferenceSession(onnx_path, providers=providers)
+        self.binding = self.session.io_binding()
+
+    def __call__(self, pixel_values, pixel_mask=None):
+        from transformers.models.detr.modeling_detr import DetrObjectDetectionOutput
+        pixel_values = pixel_values.to(DEVICE, torch.float32).contiguous()
+        if pixel_mask is None:
+            pixel_mask = torch.ones(pixel_values.shape[0], *pixel_values.shape[2:], dtype=torch.int64, device=DEVICE)
+        pixel_mask = pixel_mask.to(DEVICE, torch.int64).contiguous()
+
+        # Inputs are bound in place on the GPU - no host staging
+        self.binding.clear_binding_inputs()
+        self.binding.clear_binding_outputs()
+        self.binding.bind_input("pixel_values", "cuda", 0, np.float32, tuple(pixel_values.shape), pixel_values.data_ptr())
+        self.binding.bind_input("pixel_mask", "cuda", 0, np.int64, tuple(pixel_mask.shape), pixel_mask.data_ptr())
+        self.binding.bind_output("logits", "cuda")
+        self.binding.bind_output("pred_boxes", "cuda")
+        self.session.run_with_iobinding(self.binding)
+        logits, pred_boxes = self.binding.copy_outputs_to_cpu()  # Small: (N, 100, classes) / (N, 100, 4)
+        return DetrObjectDetectionOutput(logits=torch.from_numpy(logits), pred_boxes=torch.from_numpy(pred_boxes))
+
+def export_detr_onnx(model, onnx_path):
+    """One-time ONNX export of DETR with dynamic batch/height/width."""
+    class _Wrapper(torch.nn.Module):
+        def __init__(self, detr):
+            super().__init__()
+            self.detr = detr
+
+        def forward(self, pixel_values, pixel_mask):
+            out = self.detr(pixel_values=pixel_values, pixel_mask=pixel_mask)
+            return out.logits, out.pred_boxes
+
+    dummy_pixels = torch.zeros(1, 3, 800, 800, device=DEVICE)
+    dummy_mask = torch.ones(1, 800, 800, dtype=torch.int64, device=DEVICE)
+    torch.onnx.export(
+        _Wrapper(model), (dummy_pixels, dummy_mask), onnx_path,
+        input_names=["pixel_values", "pixel_mask"], output_names=["logits", "pred_boxes"],
+        dynamic_axes={
+            "pixel_values": {0: "batch", 2: "height", 3: "width"},
+            "pixel_mask": {0: "batch", 1: "height", 2: "width"},
+            "logits": {0: "batch"}, "pred_boxes": {0: "batch"},
+        },
+        opset_version=17,
+    )
+
+if not detection_engine and DEVICE == "cuda":
+    # Engines are cached next to the weights, so only the first run pays the build cost
+    weights_dir = os.path.dirname(YOLO_WEIGHTS_PATH)
+    try:
+        yolo_engine = os.path.splitext(yolo_weights)[0] + ".engine"
+        if not os.path.exists(yolo_engine):
+            print("Exporting YOLOv8 TensorRT engine (one-time)...")
+            # Dynamic batch, as in DetectionEngine._load_yolo_model - _standalone_reports batches YOLO misses
+            yolo_engine = yolo_model.export(format="engine", half=True, imgsz=640, dynamic=True, batch=EVAL_BATCH_SIZE)
+        yolo_model = YOLO(yolo_engine)
+        print("✅ YOLOv8 running on TensorRT")
+    except Exception as e:
+        print(f"YOLOv8 TensorRT unavailable, using PyTorch: {e}")
+
+    if ort is not None:
+        try:
+            os.makedirs(weights_dir, exist_ok=True)
+            detr_onnx = os.path.join(weights_dir, "detr-weapons.onnx")
+            if not os.path.exists(detr_onnx):
+                print("Exporting DETR to ONNX (one-time)...")
+                export_detr_onnx(detr_model, detr_onnx)
+            detr_model = OnnxDetr(detr_onnx, weights_dir)
+            print("✅ DETR running on ONNX Runtime")
+        except Exception as e:
+            print(f"DETR ONNX Runtime unavailable, using PyTorch: {e}")
 
 # ==========================================
 # STEP 3: CORE UTILITIES
 # ==========================================
 
+eval_loop = asyncio.new_event_loop()  # Reused by every DetectionEngine call
+
 def download_file(url, local_path):
     """Robust download utility."""
     headers = {
@@ -121,60 +236,136 @@ def download_file(url, local_path):
         print(f"Download error: {e}")
         return False
 
-def run_evaluation_inference(image_path, conf_threshold=0.75):
-    """Abstraction layer for inference using either DetectionEngine or standalone models."""
-    if not os.path.exists(image_path):
-        return {"model": "None", "detections": 0, "status": "Missing"}
-
-    img = cv2.imread(image_path)
-    if img is None:
-        return {"model": "None", "detections": 0, "status": "Corrupted"}
+def run_evaluation_inference(image_or_path, conf_threshold=0.75):
+    """Abstraction layer for inference using either DetectionEngine or standalone models.
+    Accepts an image path or an already-decoded BGR frame (skips the disk round-trip)."""
+    if isinstance(image_or_path, np.ndarray):
+        img = image_or_path
+    else:
+        if not os.path.exists(image_or_path):
+            return {"model": "None", "detections": 0, "status": "Missing"}
+        img = cv2.imread(image_or_path)
+        if img is None:
+            return {"model": "None", "detections": 0, "status": "Corrupted"}
 
     if detection_engine:
-        # Wrap the async call
-        import asyncio
-        res = asyncio.run(detection_engine.analyze_frame(img))
+        # Wrap the async call - one loop for the whole evaluation (asyncio.run would build and
+        # tear down a loop per frame and restart the engine's micro-batch worker each time)
+        res = eval_loop.run_until_complete(detection_engine.analyze_frame(img))
         return {
             "model": "DetectionEngine",
             "detections": 1 if res["detected"] else 0,
             "status": "OK"
         }
     else:
-        # Standalone logic
-        # 1. DETR
-        image_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        inputs = detr_processor(images=image_rgb, return_tensors="pt").to(DEVICE)
-        with torch.no_grad():
-            outputs = detr_model(**inputs)
-        results = detr_processor.post_process_object_detection(
-            outputs, threshold=conf_threshold, target_sizes=[image_rgb.shape[:2]]
-        )[0]
-
-        if len(results["scores"]) > 0:
-            return {"model": "DETR", "detections": len(results["scores"]), "status": "OK"}
-        
-        # 2. YOLO Fallback
-        yolo_res = yolo_model(image_path, conf=conf_threshold, verbose=False)[0]
-        return {"model": "YOLO", "detections": len(yolo_res.boxes), "status": "OK"}
+        return run_standalone_batch([img], conf_threshold)[0]
+
+def run_standalone_batch(images, conf_threshold=0.75):
+    """Standalone DETR (+ YOLO fallback) over a list of BGR frames in one forward pass each."""
+    # 1. DETR - one batched forward; the processor pads mixed sizes and returns a pixel mask
+    images_rgb = [cv2.cvtColor(img, cv2.COLOR_BGR2RGB) for img in images]
+    inputs = detr_processor(images=images_rgb, return_tensors="pt").to(DEVICE)
+    with torch.inference_mode():
+        outputs = detr_model(**inputs)
+    return _standalone_reports(outputs, [img.shape[:2] for img in images_rgb], lambda i: images[i], conf_threshold)
+
+def run_standalone_batch_gpu(frames_rgb, conf_threshold=0.75):
+    """Standalone DETR (+ YOLO fallback) over an (N, H, W, 3) uint8 RGB batch already on the GPU.
+    Resize/normalize run on the GPU, bypassing the (CPU-only) DETR processor."""
+    height, width = frames_rgb.shape[1:3]
+    size = detr_processor.size
+    scale = min(size.get("shortest_edge", 800) / min(height, width), size.get("longest_edge", 1333) / max(height, width))
+    pixels = frames_rgb.permute(0, 3, 1, 2).float().div_(255.0)
+    pixels = torch.nn.functional.interpolate(
+        pixels, size=(round(height * scale), round(width * scale)), mode="bilinear", align_corners=False
+    )
+    mean = torch.tensor(detr_processor.image_mean, device=pixels.device).view(1, 3, 1, 1)
+    std = torch.tensor(detr_processor.image_std, device=pixels.device).view(1, 3, 1, 1)
+    pixels = (pixels - mean) / std
+    with torch.inference_mode():
+        outputs = detr_model(pixel_values=pixels)
+    return _standalone_reports(
+        outputs, [(height, width)] * len(frames_rgb),
+        lambda i: frames_rgb[i].flip(-1).cpu().numpy(),  # YOLO fallback takes BGR numpy
+        conf_threshold
+    )
+
+def _standalone_reports(outputs, target_sizes, get_bgr, conf_threshold):
+    """DETR post-processing plus a batched YOLO pass over the frames DETR found nothing in."""
+    results = detr_processor.post_process_object_detection(
+        outputs, threshold=conf_threshold, target_sizes=target_sizes
+    )
+    reports = [
+        {"model": "DETR", "detections": len(r["scores"]), "status": "OK"} if len(r["scores"]) > 0 else None
+        for r in results
+    ]
+
+    # 2. YOLO Fallback - batched over the misses
+    misses = [i for i, report in enumerate(reports) if report is None]
+    if misses:
+        yolo_results = yolo_model([get_bgr(i) for i in misses], conf=conf_threshold, verbose=False)
+        for i, yolo_res in zip(misses, yolo_results):
+            reports[i] = {"model": "YOLO", "detections": len(yolo_res.boxes), "status": "OK"}
+    return reports
+
+def sample_frames(cap, frame_skip):
+    """Yield (frame_number, frame) for every frame_skip-th frame (1-based numbering)."""
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if total > 0:
+        # Seek straight to each sampled frame instead of decoding and discarding the ones between
+        for idx in range(frame_skip - 1, total, frame_skip):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+            ret, frame = cap.read()
+            if not ret: return
+            yield idx + 1, frame
+        return
+    # Unknown length (e.g. a live stream) - grab() skips frames without converting/copying them
+    frame_number = 0
+    while cap.grab():
+        frame_number += 1
+        if frame_number % frame_skip != 0: continue
+        ret, frame = cap.retrieve()
+        if ret: yield frame_number, frame
+
+def evaluate_video_nvdec(video_path, frame_skip=15):
+    """Standalone video evaluation with NVDEC decode - sampled frames land directly in GPU memory."""
+    vr = decord.VideoReader(video_path, ctx=decord.gpu(0))
+    indices = list(range(frame_skip - 1, len(vr), frame_skip))
+    detections = 0
+    for start in range(0, len(indices), EVAL_BATCH_SIZE):
+        frames = vr.get_batch(indices[start:start + EVAL_BATCH_SIZE])  # (N, H, W, 3) uint8 RGB on GPU
+        detections += sum(r["detections"] > 0 for r in run_standalone_batch_gpu(frames))
+    return detections, len(vr)
 
 def evaluate_video(video_path, frame_skip=15):
     """Processes video for evaluation."""
     if not os.path.exists(video_path): return 0, 0
+    if not detection_engine and DECORD_AVAILABLE and DEVICE == "cuda":
+        try:
+            return evaluate_video_nvdec(video_path, frame_skip)
+        except Exception as e:  # e.g. decord built without CUDA
+            print(f"NVDEC decode unavailable, using OpenCV: {e}")
     cap = cv2.VideoCapture(video_path)
-    frames_checked = 0
+    frames_checked = max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0)
     detections = 0
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret: break
-        frames_checked += 1
-        if frames_checked % frame_skip != 0: continue
+    batch = []
+    for frame_number, frame in sample_frames(cap, frame_skip):
+        frames_checked = max(frames_checked, frame_number)
         
-        cv2.imwrite("temp_eval.jpg", frame)
-        res = run_evaluation_inference("temp_eval.jpg")
-        if res["detections"] > 0:
-            detections += 1
+        # In-memory handoff - no JPEG encode/write/read/decode per frame
+        if detection_engine:
+            res = run_evaluation_inference(frame)
+            if res["detections"] > 0:
+                detections += 1
+        else:
+            # Standalone models: batch sampled frames into one DETR forward
+            batch.append(frame)
+            if len(batch) == EVAL_BATCH_SIZE:
+                detections += sum(r["detections"] > 0 for r in run_standalone_batch(batch))
+                batch = []
+    if batch:
+        detections += sum(r["detections"] > 0 for r in run_standalone_batch(batch))
     cap.release()
-    if os.path.exists("temp_eval.jpg"): os.remove("temp_eval.jpg")
     return detections, frames_checked
 
 # ==========================================